@@ -19,10 +19,10 @@
 """
 
 import gtk, pango, sys
-import os, gettext
+import os, gettext, time, csv, json
 import pygtk
 pygtk.require('2.0')
-from gobject import timeout_add
+from gobject import timeout_add, source_remove
 
 try:
     from gimpfu import *
@@ -30,6 +30,9 @@ try:
 except ImportError:
     print("Note: GIMP is needed, '%s' is a plug-in for it.\n"%fi)
     sys.exit(1)
+# pure geometry, in the same folder as this plug-in
+from arrows_geometry import arrow_geometry, bounding_box, batch_geometry,\
+    four_var, shaft_shapes, bezier_controls
 
 ### global variables ###########################################################
 
@@ -39,7 +42,10 @@ fi = __file__
 locale_directory = os.path.join(os.path.dirname(os.path.abspath(fi)), 'locale')
 gettext.install( "ArrowsCreator", locale_directory, unicode=True )
 
-brush_name = ''
+# the generated brush, a 'BrushSession'
+ac_brush = None
+# a 'ProfiledPDB' when profiling is set in the configuration file
+profiler = None
 message = ''
 # to detect if an arrow was drawn
 arrow_done = False
@@ -48,9 +54,9 @@ measurements = []
 # pointing with vectors
 init_paths = []
 ID_path = None
-# timeout interval config?
-Clock2 = []
-inter_val = 0
+# interval of 'update()' in ms: while the anchors move and its cap when idle
+fast_interval = 40
+slow_interval = 800
 # Start of arrow info
 stub = _(u"Segment %d, arrow %d: ")
 # to make it run for 2.6 and in 2.8
@@ -63,6 +69,365 @@ start_minver = 6 # minor version of the previous GIMP
 # for missing top layer (user error)
 layer_miss = False
 
+### Path tracking ##############################################################
+
+class PathTracker():
+    """
+    Adaptive interval for 'ArrowWindow.update()'. A signature of the stroke
+    points tells if the anchors moved: while they move the interval is short
+    (at least the last redraw time, to leave GIMP some room), while they stay
+    still it doubles at each tick up to 'slow'.
+    """
+    def __init__(self, fast, slow):
+        self.fast = fast        # interval (ms) while dragging
+        self.slow = slow        # maximum interval (ms) when idle
+        self.interval = fast
+        self.signature = None
+        self.moved = False
+        # for each regime: [ticks, CPU of the plug-in (s), sum of intervals (ms)]
+        self.stats = {'active': [0, 0.0, 0], 'idle': [0, 0.0, 0]}
+        # (waiting interval before the detection, redraw time) in ms
+        self.latency = []
+        # PDB calls of each redraw
+        self.calls = []
+
+    def probe(self, points):
+        """ Return True if the stroke 'points' changed since the last probe """
+        signature = hash((tuple(points[0]), points[1]))
+        self.moved = signature != self.signature
+        self.signature = signature
+        return self.moved
+
+    def next_interval(self, active, cpu, render=0.0):
+        """ Account for the tick and return the interval before the next one """
+        regime = 'idle'
+        if active :
+            regime = 'active'
+            if render : self.latency.append((self.interval, render))
+            self.interval = max(self.fast, int(render))
+        else : self.interval = min(self.interval*2, self.slow)
+        stat = self.stats[regime]
+        stat[0] += 1
+        stat[1] += cpu
+        stat[2] += self.interval
+        return self.interval
+
+    def saturated(self):
+        """ Idle at the maximum interval, time for the less frequent checks """
+        return self.interval >= self.slow
+
+    def summary(self):
+        """ Text of the measured ticks and latency, with the profile """
+        txt = "ArrowsCreator tracking:"
+        for regime in ('active', 'idle') :
+            ticks, cpu, wait = self.stats[regime]
+            if ticks :
+                txt += "\n  %s: %d ticks, mean interval %.0f ms, CPU %.2f ms/tick"\
+                    %(regime, ticks, wait/float(ticks), 1000.0*cpu/ticks)
+                if wait : txt += " (%.1f%% of the time)"%(100000.0*cpu/wait)
+        if self.latency :
+            nr = len(self.latency)
+            wait = sum([l[0] for l in self.latency])/float(nr)
+            render = sum([l[1] for l in self.latency])/float(nr)
+            txt += "\n  latency: %d redraws, detection <= %.0f ms + redraw %.0f ms"\
+                %(nr, wait, render)
+        if self.calls :
+            txt += "\n  PDB calls per redraw: mean %.1f, max %d"\
+                %(sum(self.calls)/float(len(self.calls)), max(self.calls))
+        return txt
+
+### Profiling ##################################################################
+
+class ProfiledPDB(object):
+    """
+    Stands for 'pdb' in this module while profiling: each procedure call is
+    timed and counted, and the tracking ticks that redraw are the frames with
+    their latency split in PDB time and the rest (geometry, GTK). 'dump()'
+    writes it all in a JSON file.
+    """
+    # upper limits (ms) of the histogram bins, the last bin is above
+    bins = (5, 10, 20, 50, 100, 200, 500, 1000)
+
+    def __init__(self, pdb):
+        self.pdb = pdb
+        self.procs = {}         # name: [count, time (s)]
+        self.frame_calls = 0
+        self.frame_time = 0.0   # PDB time in the current frame
+        self.start = time.time()
+        self.frames = []        # (latency, PDB time, flush time) in ms, PDB calls
+        self.flush = 0.0
+
+    def __getattr__(self, name):
+        proc = getattr(self.pdb, name)
+        stat = self.procs.setdefault(name, [0, 0.0])
+        def timed(*args, **kw) :
+            start = time.time()
+            try : return proc(*args, **kw)
+            finally :
+                lapse = time.time() - start
+                stat[0] += 1
+                stat[1] += lapse
+                self.frame_calls += 1
+                self.frame_time += lapse
+                if name == 'gimp_displays_flush' : self.flush += lapse
+        return timed
+
+    def begin(self):
+        # start of a tracking tick
+        self.frame_calls = 0
+        self.frame_time = 0.0
+        self.flush = 0.0
+        self.tick = time.time()
+
+    def end(self, drawn):
+        # end of the tick, a frame if the arrow was redrawn
+        if drawn :
+            self.frames.append((1000.0*(time.time() - self.tick),\
+                1000.0*self.frame_time, 1000.0*self.flush, self.frame_calls))
+
+    def histogram(self, values):
+        # counts below each bin limit, the last count is for the rest
+        counts = [0]*(len(self.bins) + 1)
+        for value in values :
+            i = 0
+            while i < len(self.bins) and value >= self.bins[i] : i += 1
+            counts[i] += 1
+        return {'below': list(self.bins), 'counts': counts}
+
+    def dump(self, file_name, extra=None):
+        """ Write the profile in 'file_name', with the 'extra' items """
+        procs = [(t, n, c) for n, (c, t) in self.procs.items()]
+        procs.sort(reverse=True)
+        frames = self.frames
+        report = {
+            'gimp': list(version),
+            'duration_s': time.time() - self.start,
+            'frames': len(frames),
+            'calls': [{'name': n, 'count': c, 'time_ms': 1000.0*t}\
+                      for t, n, c in procs],
+            'latency_ms': self.histogram([f[0] for f in frames]),
+            'pdb_ms': self.histogram([f[1] for f in frames]),
+            'other_ms': self.histogram([f[0] - f[1] for f in frames]),
+            'flush_ms': self.histogram([f[2] for f in frames]),
+            'frame_calls': [f[3] for f in frames]}
+        if frames :
+            report['mean_ms'] = {
+                'latency': sum([f[0] for f in frames])/len(frames),
+                'pdb': sum([f[1] for f in frames])/len(frames),
+                'flush': sum([f[2] for f in frames])/len(frames)}
+        if extra : report.update(extra)
+        f = open(file_name, 'w')
+        json.dump(report, f, indent=1, sort_keys=True)
+        f.close()
+
+### Generated brush ############################################################
+
+class BrushSession():
+    """
+    Owns the generated round 'AC_brush', made the context brush until 'close()'
+    (also a context manager). The radius, shape and hardness are kept here so
+    a PDB call is done only when a value changes; a radius for a special mark
+    stays until a step asks for the shaft radius 'base' again (lazy restore).
+    'calls' counts the PDB calls since 'frame()'.
+    """
+    def __init__(self, base=11.0):
+        self.previous = pdb.gimp_context_get_brush()
+        #self.name = pdb.gimp_brush_duplicate(bru_con_nam) #next line gives less surprise
+        self.name = pdb.gimp_brush_new('AC_brush')
+        self.calls = 2
+        self.base = base        # radius of the shaft strokes
+        self.radius = None
+        self.shape = None
+        self.hardness = None
+        self.set_shape(0)
+        self.set_hardness(1.0)
+        pdb.gimp_context_set_brush(self.name)
+        self.calls += 1
+        if version[1]  >  start_minver:
+            pdb.gimp_context_set_dynamics("Dynamics Off")
+            self.calls += 1
+        self.context = True     # memo of 'is_context()' for the frame
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def use(self, radius=None):
+        # the brush radius for the next paint step, 'base' by default
+        if radius == None : radius = self.base
+        if radius != self.radius :
+            pdb.gimp_brush_set_radius(self.name, radius)
+            self.radius = radius
+            self.calls += 1
+
+    def set_shape(self, shape):
+        if shape != self.shape :
+            pdb.gimp_brush_set_shape(self.name, shape)
+            self.shape = shape
+            self.calls += 1
+
+    def set_hardness(self, hardness):
+        if hardness != self.hardness :
+            pdb.gimp_brush_set_hardness(self.name, hardness)
+            self.hardness = hardness
+            self.calls += 1
+
+    def is_context(self):
+        """ True if the user didn't change the context brush, asked once a frame """
+        if self.context == None :
+            self.context = pdb.gimp_context_get_brush() == self.name
+            self.calls += 1
+        return self.context
+
+    def frame(self):
+        """ Start a frame, return the PDB calls of the previous one """
+        calls = self.calls
+        self.calls = 0
+        self.context = None
+        return calls
+
+    def close(self):
+        # back to the user brush
+        pdb.gimp_context_set_brush(self.previous)
+        pdb.gimp_brush_delete(self.name)
+
+### Render planner #############################################################
+
+class RenderPlan():
+    """
+    The drawing of a frame (or of a batch of arrows) as a list of steps, each
+    with the selection it needs: a union of polygons, ellipse and rectangle
+    boxes, maybe inverted, or None for no selection. The first shape of a
+    selection replaces the previous one, so the plan goes from step to step
+    without 'gimp_selection_none', reuses a selection shared by consecutive
+    steps and merges consecutive fills of the same kind in one selection and
+    one fill. Coordinates are in image pixels, 'origin' is the layer offsets.
+    The brush steps go through the 'BrushSession' 'brush'.
+    """
+    def __init__(self, img, layer, brush, origin=(0, 0)):
+        self.img = img
+        self.layer = layer
+        self.brush = brush
+        self.origin = origin
+        self.steps = []     # [selection, action, arguments]
+        self.calls = 0      # PDB calls done by 'run()'
+
+    def selection(self, polygons=(), ellipses=(), rects=(), invert=False):
+        """ A selection to give to several steps, so it is made only once """
+        shapes = [('polygon', tuple(p)) for p in polygons]
+        shapes += [('ellipse', tuple(e)) for e in ellipses]
+        shapes += [('rect', tuple(r)) for r in rects]
+        return (shapes, invert)
+
+    def fill(self, fill_type, polygons=(), ellipses=()):
+        last = self.steps and self.steps[-1]
+        if last and last[1] == 'fill' and last[2] == (fill_type,) and not last[0][1]:
+            # one more shape in the same fill
+            last[0][0].extend(self.selection(polygons, ellipses)[0])
+        else :
+            self.steps.append([self.selection(polygons, ellipses), 'fill',\
+                               (fill_type,)])
+
+    def clear(self, box):
+        self.steps.append([self.selection(rects=(box,)), 'clear', ()])
+
+    def paint(self, strokes, gradient=0.0, fade=0.0, selection=None):
+        # paint-brush strokes, clipped by 'selection' if any
+        for stroke in strokes :
+            self.steps.append([selection, 'paint', (tuple(stroke), fade, gradient)])
+
+    def dab(self, marks, radius):
+        # brush marks (x, y) of a given radius
+        self.steps.append([None, 'dab', (tuple(marks), radius)])
+
+    def outline(self, ellipses, radius):
+        # stroke the selection border with a brush of 'radius'
+        self.steps.append([self.selection(ellipses=ellipses), 'outline', (radius,)])
+
+    def stroke_vectors(self, vectors, stop=None):
+        # stroke a path, outside of the ellipse box 'stop' if any
+        selection = None
+        if stop : selection = self.selection(ellipses=(stop,), invert=True)
+        self.steps.append([selection, 'vectors', (vectors,)])
+
+    def local(self, coords):
+        # paint tools take drawable coordinates, the selections image ones
+        off_x, off_y = self.origin
+        return [c - (off_x, off_y)[i%2] for i, c in enumerate(coords)]
+
+    def select(self, selection):
+        shapes, invert = selection
+        operation = CHANNEL_OP_REPLACE
+        for kind, coords in shapes :
+            if kind == 'polygon' :
+                if version[1] == start_minver :
+                    pdb.gimp_free_select(self.img, len(coords), coords, operation,\
+                        True, False, 0)
+                elif version[1]  >  start_minver :
+                    pdb.gimp_image_select_polygon(self.img, operation, len(coords),\
+                        coords)
+            elif kind == 'ellipse' :
+                x, y, w, h = coords
+                if version[1] == start_minver :
+                    pdb.gimp_ellipse_select(self.img, x, y, w, h, operation, True,\
+                        False, 0)
+                elif version[1]  >  start_minver :
+                    pdb.gimp_image_select_ellipse(self.img, operation, x, y, w, h)
+            else :
+                x, y, w, h = coords
+                if version[1] == start_minver :
+                    pdb.gimp_rect_select(self.img, x, y, w, h, operation, False, 0)
+                elif version[1]  >  start_minver :
+                    pdb.gimp_image_select_rectangle(self.img, operation, x, y, w, h)
+            operation = CHANNEL_OP_ADD
+            self.calls += 1
+        if invert :
+            pdb.gimp_selection_invert(self.img)
+            self.calls += 1
+
+    def run(self):
+        """
+         Do the steps, leave the image without selection; the brush radius is
+         set back only by the next step needing the shaft radius.
+        """
+        current = None
+        for selection, action, args in self.steps :
+            if selection is not current and selection != current :
+                if selection : self.select(selection)
+                else :
+                    pdb.gimp_selection_none(self.img)
+                    self.calls += 1
+                current = selection
+            if action == 'fill' :
+                pdb.gimp_edit_fill(self.layer, args[0])
+            elif action == 'clear' :
+                pdb.gimp_edit_clear(self.layer)
+            elif action == 'paint' :
+                stroke, fade, gradient = args
+                self.brush.use()
+                pdb.gimp_paintbrush(self.layer, fade, len(stroke),\
+                    self.local(stroke), 0, gradient)
+            elif action == 'dab' :
+                marks, radius = args
+                self.brush.use(radius)
+                for mark in marks :
+                    pdb.gimp_paintbrush_default(self.layer, 2, self.local(mark))
+                self.calls += len(marks) - 1
+            elif action == 'outline' :
+                self.brush.use(args[0])
+                pdb.gimp_edit_stroke(self.layer)
+            elif action == 'vectors' :
+                self.brush.use()
+                pdb.gimp_edit_stroke_vectors(self.layer, args[0])
+            self.calls += 1
+        if current :
+            pdb.gimp_selection_none(self.img)
+            self.calls += 1
+        self.steps = []
+
 ### GUI integration ############################################################
 
 class ArrowWindow(gtk.Window):
@@ -94,11 +459,12 @@ class ArrowWindow(gtk.Window):
         self.l_arrow = 0.1      # arrow length
         self.theta = 0          # arrow orientation angle in °
         self.direct = True      # arrow from first point to second if True
+        self.coords = ()        # the 12 coordinates of the stroke drawn
+        self.tracker = PathTracker(fast_interval, slow_interval)
+        self.source = None      # id of the armed 'update()' timeout
 
         # Make a new GIMP layer to draw on
-        self.layer = gimp.Layer(img, _("AC_arrow #1"), img.width, img.height,
-                                RGBA_IMAGE, 100, NORMAL_MODE)
-        img.add_layer(self.layer, 0)
+        self.layer = self.new_layer(_("AC_arrow #1"))
         # Verifies that it start at 1, not the case if we close and resume later
         if version[1] == start_minver : 
             name_layer = pdb.gimp_drawable_get_name(self.layer)
@@ -177,11 +543,11 @@ class ArrowWindow(gtk.Window):
         table.attach(scale, 1, 2, 1, 2)
 
         # Arrowshaft width
-        label = gtk.Label(_("Brush size (radius,PX)\n for '%s'")%brush_name)
+        label = gtk.Label(_("Brush size (radius,PX)\n for '%s'")%ac_brush.name)
         label.set_alignment(xalign=0.0, yalign=1.0)
         table.attach(label, 0, 1, 2, 3, xoptions=gtk.FILL, yoptions=0)
         adj = gtk.Adjustment(self.brush, 1.0, 25, 2.0, 2.0)
-        pdb.gimp_brush_set_radius(brush_name, self.brush)
+        ac_brush.base = self.brush
         adj.connect("value_changed", self.brush_cb)
         scale = gtk.HScale(adj)
         scale.set_digits(0)
@@ -309,7 +675,7 @@ class ArrowWindow(gtk.Window):
             # check if there is an under layer and merge
             if len(self.img.layers) > 1 :
                 self.img.raise_layer_to_top(self.layer)
-                self.layer = self.img.merge_down(self.layer, 1)
+                self.layer = self.img.merge_down(self.layer, EXPAND_AS_NECESSARY)
             else : 
                 self.terminate(_("layer to merge with"))
                 return
@@ -332,6 +698,7 @@ class ArrowWindow(gtk.Window):
         if self.changed : return
         self.direct = not self.direct
         self.changed = True
+        self.wake()
 
     def headsize_cb(self, val) :
         if self.changed and arrow_done :
@@ -342,6 +709,7 @@ class ArrowWindow(gtk.Window):
             return
         self.headSize = val.value
         self.changed = True
+        self.wake()
 
     def headangle_cb(self, val) :
         if self.changed and arrow_done : 
@@ -351,9 +719,10 @@ class ArrowWindow(gtk.Window):
             return
         self.wingAngle = val.value
         self.changed = True
+        self.wake()
 
     def brush_cb(self, val) :
-        if pdb.gimp_context_get_brush() != brush_name :
+        if not ac_brush.is_context() :
             self.label2.set_label(stub%(self.segment_cr, self.arrow_cr) +\
                 self.states[6])
             return
@@ -363,8 +732,10 @@ class ArrowWindow(gtk.Window):
                 self.states[8])
             return
         self.brush = val.value
-        pdb.gimp_brush_set_radius(brush_name, self.brush)
+        # set on the brush at the next stroke
+        ac_brush.base = self.brush
         self.changed = True
+        self.wake()
 
     def slider3_cb(self, val) :
         if self.changed and arrow_done : 
@@ -374,6 +745,7 @@ class ArrowWindow(gtk.Window):
             return
         self.slider3 = val.value
         self.changed = True
+        self.wake()
 
     def slider3_lim(self, adj) :
         adj.set_lower(self.a3min)
@@ -406,14 +778,54 @@ class ArrowWindow(gtk.Window):
             self.a3max = 200
             self.adj.changed()
         self.changed = True
+        self.wake()
         
     def update(self, *args):
-        # decides for updating the arrow
-        
-        global ID_path, Clock2, arrow_done, layer_miss
+        # one tick of the path tracking, re-armed at the tracker interval
+        if not self.miss : return False
+        cpu = sum(os.times()[:2])
+        start = time.time()
+        self.tracker.moved = False
+        drawn = False
+        render = 0.0
+        try :
+            if profiler : profiler.begin()
+            drawn = self.track()
+            if profiler : profiler.end(drawn)
+            calls = ac_brush.frame()
+            if drawn :
+                render = (time.time() - start)*1000.0
+                self.tracker.calls.append(self.plan.calls + calls)
+        finally :
+            # re-armed even if 'track()' failed (a path deleted by the user)
+            if self.miss :
+                cpu = sum(os.times()[:2]) - cpu
+                active = drawn or self.tracker.moved
+                interval = self.tracker.next_interval(active, cpu, render)
+                self.source = timeout_add(interval, self.update)
+        return False
+
+    def wake(self):
+        # a value changed in this window: redraw soon, not at the idle interval
+        if self.source and self.tracker.interval > self.tracker.fast :
+            source_remove(self.source)
+            self.tracker.interval = self.tracker.fast
+            self.source = timeout_add(self.tracker.fast, self.update)
+
+    def track(self):
+        # decides for updating the arrow, return True if it was redrawn
+
+        global ID_path, arrow_done, layer_miss
+
+        # cheap probe: only the points of the known path when nothing else changed,
+            # the checks below are done on a move or at the slowest idle ticks
+        probed = False
+        if ID_path != None and not self.changed and not self.tracker.saturated() :
+            try:
+                if not self.tracker.probe(ID_path.strokes[0].points) : return False
+                probed = True
+            except: pass
 
-        timeout_add(inter_val, self.update, self)
-        
         if self.miss :
             # check if image or layer or vector still there, if not exit plug-in
             if self.img not in gimp.image_list() :
@@ -433,7 +845,10 @@ class ArrowWindow(gtk.Window):
 
             try:
                 points = paths[0].strokes[0].points
-            except: return
+                if ID_path != None and len(paths) > 1 :
+                    points = ID_path.strokes[0].points
+            except: return False
+            if not probed : self.tracker.probe(points)
         
             # 2 anchors with 2 handles each (6 coord. per anchor), points[0] stores
                 # the coordinates, points[1] = True if the path is closed.
@@ -450,7 +865,6 @@ class ArrowWindow(gtk.Window):
                 return
             
             if ID_path == None: ID_path = paths[0]
-            elif len(paths) > 1: points = ID_path.strokes[0].points
             # coordinates of first and next anchor
             lastX = nr_coord-4; lastY = nr_coord-3
             x1 = int(points[0][2]) ; x2 = int(points[0][lastX])
@@ -472,16 +886,32 @@ class ArrowWindow(gtk.Window):
             
             # ID_path => tattoo?
             self.x1, self.y1, self.x2, self.y2 = x1, y1, x2, y2
+
+            # same arrow as on the layer, only the info line to refresh
+            key = (x1, y1, x2, y2, self.direct, self.headSize, self.wingAngle,\
+                self.brush, self.slider3, self.choice_i)
+            if self.choice_i == 6 : key += tuple(points[0])
+            if key == self.drawn_key :
+                self.changed = False
+                self.label2.set_label(stub%(self.segment_cr, self.arrow_cr)+\
+                    "%.1f px, %.1f°: %s"%(self.l_arrow, self.theta, self.states[1]))
+                return False
+            self.drawn_key = key
+            self.coords = points[0]
             
             if version[1] < 8 : self.img.disable_undo()
             paths[0].visible = True
 
-            # Clear the layer, erasing the old arrow
-            self.layer.fill(TRANSPARENT_FILL)
+            # Fit the layer to the arrow and erase the old arrow
+            self.plan = RenderPlan(self.img, self.layer, ac_brush)
+            self.fit_layer(bounding_box(points[0], self.choice_i, self.headSize,\
+                self.brush, self.slider3))
+            self.plan.origin = self.layer_box[:2]
 
             # Draw the new arrow from arrowhead to second X, Y pair.
             if self.direct : self.arrow_sel(x1, y1, x2, y2)
             else : self.arrow_sel(x2, y2, x1, y1)
+            self.plan.run()
             self.changed = False
             pdb.gimp_displays_flush()
 
@@ -493,350 +923,145 @@ class ArrowWindow(gtk.Window):
 
     def arrow_sel(self, x1, y1, x2, y2) :
         """
-         Computes common values for arrow and select 
-         which function to call based on arrow type to draw it. 
+         Computes the arrow with 'arrows_geometry' and select 
+         which function to call based on arrow type to plan its drawing. 
         """ 
-        # coords for arrowhead shape: 'points = []'
-        # coords for arrow-shaft: strokes(start, end)
-        strokes = [x1, y1, x2, y2]
-
-        dy = y2 - y1
-        dx = x2 - x1
-        self.l_arrow = math.hypot(dx, dy)
-        # arrowhead theoretical length (for the stroke path arrows)
-        l_head_th = self.headSize * math.cos(self.wingAngle * math.pi / 180.)
-        # computes values for direction
-        theta = math.atan2(dy, dx)
-        # it gives answer 0 to pi and 0 to -pi considering the signs of dy & dx
-        self.theta = theta * 180 / math.pi  # for the user info
-
-        # call one of straigth or path, def 'self.l_head', return 'points'
-        if self.choice_i == 6 and l_head_th != 0 : points = self.head4path(x2, y2, l_head_th)
-        else : points = self.head4staigth(x1, y1, x2, y2, theta)
-        
-        # if the 3 points are not colinear, then place a head
-        head_bool = int(self.l_head) > 0 and  points[0][2:4] != points[0][4:6]
-        # if swept wings head
-        if self.choice_i == 3 :
-            head_bool = head_bool and math.hypot(x2-points[0][4], y2-points[0][5])> 1.0
-        # if straigth return 'strokes', for path dont need it
-        strokes, ratio_ha = self.shaft_coord(dx, dy, strokes)
+        controls = None
+        # the curve from the stroke points read by 'track()', no PDB call
+        if self.choice_i == 6 : controls = bezier_controls(self.coords)
+        arrow = arrow_geometry(x1, y1, x2, y2, self.choice_i, self.headSize,\
+            self.wingAngle, self.brush, self.slider3, self.direct, version[1],\
+            controls)
+        self.l_arrow = arrow.length
+        self.theta = arrow.theta    # for the user info
 
         # draw head(s) first--------------------
-        if head_bool and self.choice_i == 0: self.m_head(points)
+        if arrow.head_bool and self.choice_i == 0: self.m_head(arrow.heads)
         
         # draw shaft  --------------------
-        if ratio_ha < 1.0 or head_bool == False :
-            # length of the gradient cycle wanted in 2.6, not in 2.8?
-            four_var = 0
-            slider3 = abs(self.slider3)
-            if slider3 > 0 and self.choice_i < 4 :
-                # four_var is cycl_grad a FLOAT
-                if version[1]  ==  start_minver :
-                    four_var = (self.l_arrow - self.l_head)/slider3
-                else :
-                    four_var = (self.l_arrow - self.l_head)/math.sqrt(slider3)
-            elif self.choice_i == 4 :
-                # four_var is fade            
-                four_var = (self.l_arrow - self.l_head)*1.3     # fade is a FLOAT
-            elif self.choice_i > 4 : 
-                # four_var is radius
-                if self.slider3 < int(self.l_arrow - self.l_head) : 
-                    four_var = self.slider3
-                #else : four_var = 0
+        if arrow.draw_shaft :
             funct_dict = {0: self.d_shaft0, 1: self.d_shaft1, 2: self.d_shaft2,\
                           3: self.d_shaft3, 4: self.d_shaft4, 5: self.d_shaft5,\
                           6: self.d_shaft6}
-            funct_dict.get(self.choice_i)(strokes, four_var)
-            pdb.gimp_selection_none(self.img)
+            funct_dict.get(self.choice_i)(arrow.shaft)
 
         # draw head(s) after--------------------
-        if head_bool and self.choice_i: self.m_head(points)
+        if arrow.head_bool and self.choice_i: self.m_head(arrow.heads)
 
         self.label2.set_label(stub%(self.segment_cr, self.arrow_cr)+\
             "%.1f px, %.1f°: %s"%(self.l_arrow, self.theta, self.states[1]))
         return
 
-    def head4staigth(self, x1, y1, x2, y2, theta) :
-        # computes coords of head apex for straight arrowhead
-        points = []
-        aangle = self.wingAngle * math.pi / 180.
-        dxm = int(self.headSize * math.cos(theta - aangle))
-        dym = int(self.headSize * math.sin(theta - aangle))
-        dxp = int(self.headSize * math.cos(theta + aangle))
-        dyp = int(self.headSize * math.sin(theta + aangle))
-        points.append([ x2, y2,
-                   x2 - dxm, y2 - dym,
-                   x2 - dxp, y2 - dyp ])
-
-        # actual length of triangular arrowhead in the shaft direction
-        self.l_head = math.hypot(x2-(points[0][2] + points[0][4])/2.0 , y2-(\
-                points[0][3] + points[0][5])/2.0)
-        # 4 apex head, so add one apex on arrow line
-        if self.choice_i == 0 or self.choice_i == 3 :
-            if self.choice_i == 0 : shape = 1.5
-            else :                  shape = 0.75
-            dxa = int(self.l_head * shape * math.cos(theta))
-            dya = int(self.l_head * shape * math.sin(theta))
-            points = []
-            points.append([ x2, y2,
-                    x2 - dxm, y2 - dym,
-                    x2 - dxa, y2 - dya,
-                    x2 - dxp, y2 - dyp])
-        # double triangular headed
-        if self.choice_i == 2 :
-            points.append([ x1, y1,
-                       x1 + dxm, y1 + dym,
-                       x1 + dxp, y1 + dyp ])
-        return(points)
-
-    def head4path(self, x2, y2, l_head_th) :
-        # computes coords of arrowhead for path arrow
-        points = []
-        length = ID_path.strokes[0].get_length(3)
-        factor = 1.0 + (length - self.l_arrow)/length
-        for repeat in range(2) :
-            if self.direct : dist = length - l_head_th*factor
-            else : dist = l_head_th*factor
-            x_point, y_point = ID_path.strokes[0].get_point_at_dist(dist, 2)[:2]
-            l_head_new = math.hypot(x2-x_point, y2-y_point)
-            if repeat == 0: factor += (l_head_th - l_head_new)/l_head_th
-                
-        # compute the 'points' for the head in that case
-        width_arrow = l_head_new * math.tan(self.wingAngle * math.pi / 180.)
-        deltaX = width_arrow*(y2-y_point)/l_head_new
-        deltaY = width_arrow*(x2-x_point)/l_head_new
-        points.append([ x2, y2,
-                   round(x_point + deltaX), round(y_point - deltaY),
-                   round(x_point - deltaX), round(y_point + deltaY) ])
-        # actual length of arrowhead in the head direction
-        self.l_head = math.hypot(x2-(points[0][2] + points[0][4])/2.0 , y2-\
-                 (points[0][3] + points[0][5])/2.0)
-        return(points)
-
-    def shaft_coord(self, dx, dy, strokes) :
-        # compute coords for arrowshaft
-        # ratio is length_head/length_arrow, if >= 1 no shaft if there is a head
-        ratio = self.l_head / self.l_arrow
-        if self.choice_i != 6 :
-            # don't go quite all the way to the end for self.choice_i != 3, 
-            #   because of overshoot of shaft.
-            if ratio != 0 and ratio < 1.0 :
-                # a head at the end except for notched arrow where shaft is arrowlength
-                if self.choice_i != 3 :
-                    # from similar triangles
-                    lcx = int(ratio*dx)
-                    lcy = int(ratio*dy)
-                    strokes[2] -= lcx
-                    strokes[3] -= lcy
-                # a head at the beginning
-                if self.choice_i == 2 :
-                    strokes[0] += lcx
-                    strokes[1] += lcy
-                    ratio *= 2.0
-            # next is independant of arrow head size
-            if self.slider3 < 0 and ratio < 1.0 : 
-                    # inverse gradient: pdb.gimp_context_swap_colors(), not as general?
-                    strokes = [strokes[2], strokes[3], strokes[0], strokes[1]]
-            else : strokes = [strokes[0], strokes[1], strokes[2], strokes[3]] 
-        return(strokes, ratio)
-    
-    def d_shaft0(self, strokes, cycl_grad) :
+    def d_shaft0(self, shaft) :
         # Arrow shaft is a paintbrush stroke after the head
-        pdb.gimp_paintbrush(self.layer, 0.0, 4, strokes, 0, cycl_grad)
+        self.plan.paint(shaft.strokes, shaft.gradient)
         # put a rivet for fixation at shaft-head
-        br_radius = pdb.gimp_brush_get_radius(brush_name)
-        pdb.gimp_brush_set_radius(brush_name, self.brush/3.0)
-        if self.slider3 >= 0 : riv_pt = [strokes[2], strokes[3]]
-        else : riv_pt = [strokes[0], strokes[1]]
-        pdb.gimp_paintbrush_default(self.layer, 2, riv_pt)
-        pdb.gimp_brush_set_radius(brush_name, br_radius)
+        self.plan.dab((shaft.rivet,), self.brush/3.0)
         return
 
-    def d_shaft1(self, strokes, cycl_grad) :
+    def d_shaft1(self, shaft) :
         # a selection to square cut the following 'paintbrush' operation
-        width_sel = self.brush
-        deltaX = round(width_sel*(self.y2-self.y1)/self.l_arrow)
-        deltaY = round(width_sel*(self.x2-self.x1)/self.l_arrow)
-        points_shaft = [strokes[2]+deltaX , strokes[3]-deltaY,\
-                        strokes[2]-deltaX , strokes[3]+deltaY,\
-                        strokes[0]-deltaX, strokes[1]+deltaY,\
-                        strokes[0]+deltaX, strokes[1]-deltaY ]
-        if version[1] == start_minver :
-            pdb.gimp_free_select(self.img, 8,\
-                points_shaft, CHANNEL_OP_REPLACE, True, False, 0)
-        elif version[1]  >  start_minver :
-            pdb.gimp_image_select_polygon(\
-                self.img, CHANNEL_OP_REPLACE, 8, points_shaft)
-        pdb.gimp_paintbrush(self.layer, 0.0, 4, strokes, 0, cycl_grad)
+        clip = self.plan.selection((shaft.polygon,))
+        self.plan.paint(shaft.strokes, shaft.gradient, selection=clip)
         return
 
-    def d_shaft2(self, strokes, cycl_grad) :
-        # measuring arrow: X width of shaft, double heads
-        fX = (self.y2- self.y1)/self.l_arrow
-        fY = (self.x2- self.x1)/self.l_arrow
-        #width_sel = self.headSize*math.sin(self.wingAngle*math.pi/180.) + 1
-        # no head above don't produce a shaft so base it on shaft width
-        width_sel = self.brush*1.5
-        deltaX = round(width_sel*fX)
-        deltaY = round(width_sel*fY)
-        points_shaft = [strokes[2]+deltaX , strokes[3]-deltaY,
-                        strokes[2]-deltaX , strokes[3]+deltaY,
-                        # make an X shaft!
-                        strokes[0]+deltaX, strokes[1]-deltaY,
-                        strokes[0]-deltaX, strokes[1]+deltaY ]
-        # for the arrow centre symmetry: two paint-brush strokes
-        x_center = (strokes[0]+strokes[2])/2.0
-        y_center = (strokes[1]+strokes[3])/2.0
-        # to inverse the gradient
-        if self.slider3 > 0 :
-            half_stroke1 = [x_center, y_center, strokes[0], strokes[1]]
-            half_stroke2 = [x_center, y_center, strokes[2], strokes[3]]
-        else :
-            half_stroke1 = [strokes[0], strokes[1], x_center, y_center]
-            half_stroke2 = [strokes[2], strokes[3], x_center, y_center]
-        # X shaft by that selection
-        if version[1] == start_minver : 
-            pdb.gimp_free_select(self.img, 8, points_shaft, \
-                CHANNEL_OP_REPLACE, True, False, 0)
-        elif version[1]  >  start_minver :
-            pdb.gimp_image_select_polygon(self.img,\
-                CHANNEL_OP_REPLACE, 8, points_shaft)
-
-        pdb.gimp_paintbrush(self.layer, 0.0, 4, half_stroke1, 0, cycl_grad)
-        pdb.gimp_paintbrush(self.layer, 0.0, 4, half_stroke2, 0, cycl_grad)
-        
+    def d_shaft2(self, shaft) :
+        # measuring arrow: X shaft by that selection, two half strokes
+            # for the arrow centre symmetry
+        clip = self.plan.selection((shaft.polygon,))
+        self.plan.paint(shaft.strokes, shaft.gradient, selection=clip)
         return
         
-    def d_shaft3(self, strokes, cycl_grad) :
+    def d_shaft3(self, shaft) :
         # a selection for notched arrow
-        width_sel = self.brush
-        
-        if self.slider3 < 0 : 
-            strokes = [strokes[2], strokes[3], strokes[0], strokes[1]]
-        deltaX = round(width_sel*(strokes[3]-strokes[1])/self.l_arrow)
-        deltaY = round(width_sel*(strokes[2]-strokes[0])/self.l_arrow)
-        points_shaft = [strokes[2] , strokes[3],\
-                        strokes[0]-deltaX, strokes[1]+deltaY,\
-                        strokes[0]+deltaY*0.7, strokes[1]+deltaX*0.7,\
-                        strokes[0]+deltaX, strokes[1]-deltaY ]
-
-        if version[1] == start_minver :
-            pdb.gimp_free_select(self.img, 8,\
-                points_shaft, CHANNEL_OP_REPLACE, True, False, 0)
-        elif version[1]  >  start_minver :
-            pdb.gimp_image_select_polygon(\
-                self.img, CHANNEL_OP_REPLACE, 8, points_shaft)
-        if self.slider3 < 0 : 
-            strokes = [strokes[2], strokes[3], strokes[0], strokes[1]]
-        pdb.gimp_paintbrush(self.layer, 0.0, 4, strokes,\
-            0, cycl_grad)
+        clip = self.plan.selection((shaft.polygon,))
+        self.plan.paint(shaft.strokes, shaft.gradient, selection=clip)
         return
 
-    def d_shaft4(self, strokes, fade) :
+    def d_shaft4(self, shaft) :
         # labelling arrow
-        short_shaft = self.l_arrow - self.l_head
-        if self.slider3 < short_shaft : radius = self.slider3
-        elif self.slider3 < 3 :  radius = 0
-        else :  radius = int(short_shaft)
-        if radius :
+        if shaft.circle :
             # disk selection and stroke circle
-            px = strokes[0] - radius
-            py = strokes[1] - radius
-            sign = 1
-            if not self.direct : sign = -1
-            strokes[0] += round(radius*(self.x2-self.x1)*sign/self.l_arrow)
-            strokes[1] += round(radius*(self.y2-self.y1)*sign/self.l_arrow)
-            if version[1] == start_minver : 
-                pdb.gimp_ellipse_select(self.img, px, py,\
-                   2*radius, 2*radius, CHANNEL_OP_REPLACE, True, False, 0)
-            elif version[1]  >  start_minver : 
-                pdb.gimp_image_select_ellipse(self.img, CHANNEL_OP_REPLACE,\
-                   px, py, 2*radius, 2*radius)
-            br_radius = pdb.gimp_brush_get_radius(brush_name)
-            pdb.gimp_brush_set_radius(brush_name, 1.5)
-            pdb.gimp_edit_stroke(self.layer)
-            pdb.gimp_brush_set_radius(brush_name, br_radius)
-
-            pdb.gimp_selection_none(self.img)
+            self.plan.outline((shaft.circle,), 1.5)
         # put a mark at the circle centre if no radius
-        else : pdb.gimp_paintbrush(self.layer, 0.0, 2, strokes[:2], 0, 0.0)
+        else : self.plan.paint((shaft.mark,))
 
-        # inverse stroke to have stronger color at head for 2.6
-        if version[1] == start_minver :
-            strokes = [strokes[2], strokes[3], strokes[0], strokes[1]]
-        # do nothing for 2.8
-        pdb.gimp_paintbrush(self.layer, fade, 4, strokes, 0, 0.0)
+        self.plan.paint(shaft.strokes, fade=shaft.gradient)
         return
 
-    def d_shaft5(self, strokes, radius) :
+    def d_shaft5(self, shaft) :
         # disk joint arrow
-        cycl_grad = self.l_arrow - self.l_head  #cycl_grad is a FLOAT
-        #cycl_grad = 0
-        pdb.gimp_paintbrush(self.layer, 0.0, 4, [strokes[2], strokes[3], strokes[0],\
-            strokes[1]], 0,  cycl_grad)
-        if radius :
-            px = strokes[0] - radius
-            py = strokes[1] - radius
-            if version[1] == start_minver : 
-                pdb.gimp_ellipse_select(self.img, px, py, 2 * radius,\
-                    2 * radius, CHANNEL_OP_REPLACE, True, False, 0)
-            elif version[1] > start_minver :
-                pdb.gimp_image_select_ellipse(self.img, CHANNEL_OP_REPLACE,\
-                    px, py, 2 * radius, 2 * radius)
-            pdb.gimp_edit_fill(self.layer, BACKGROUND_FILL)
-            pdb.gimp_selection_none(self.img)
+        self.plan.paint(shaft.strokes, shaft.gradient)
+        if shaft.circle :
+            self.plan.fill(BACKGROUND_FILL, ellipses=(shaft.circle,))
         return
 
-    def d_shaft6(self, strokes, radius) :
+    def d_shaft6(self, shaft) :
         # Stroke the path
-        if radius :
+        if shaft.circle :
             # draw the starting disk
-            px = strokes[0]-radius
-            py = strokes[1]-radius
-            if version[1] == start_minver : 
-                pdb.gimp_ellipse_select(self.img, px, py, 2.0*radius, \
-                    2.0*radius, CHANNEL_OP_REPLACE, True, False, 0)
-            elif version[1]  >  start_minver : 
-                pdb.gimp_image_select_ellipse(self.img, CHANNEL_OP_REPLACE,\
-                    px, py, 2.0*radius, 2.0*radius)
-            pdb.gimp_edit_fill(self.layer, FOREGROUND_FILL)
-            pdb.gimp_selection_none(self.img)
-        OP_type = CHANNEL_OP_REPLACE
-        if self.l_head > 0 :
-            # make a selection to stop the stroke at the arrow head
-            x_head = strokes[2] - int(self.l_head)
-            y_head = strokes[3] - int(self.l_head)
-            if version[1] == start_minver : 
-                pdb.gimp_ellipse_select(self.img, x_head, y_head,\
-                    int(2*self.l_head)-1, int(2*self.l_head)-1, OP_type, True,\
-                    False, 0)
-            elif version[1]  >  start_minver : 
-                pdb.gimp_image_select_ellipse(self.img, OP_type,\
-                    x_head, y_head, int(2*self.l_head)-1, int(2*self.l_head)-1)
-
-            pdb.gimp_selection_invert(self.img)
-            
-        pdb.gimp_edit_stroke_vectors(self.layer, ID_path)
+            self.plan.fill(FOREGROUND_FILL, ellipses=(shaft.circle,))
+        # stop the stroke at the arrow head
+        self.plan.stroke_vectors(ID_path, shaft.stop)
         return
 
     def m_head(self, points) :
         """
          Select and paint the arrowhead shape(s) (or other decorations?) 
-         'points' is in the form [[6 coords], [6 coords], ...] for triangles
+         'points' is in the form ((6 coords), (6 coords), ...) for triangles
         """ 
-        # Select the arrowhead shape(s)
-        for h in points:
-            if version[1] == start_minver : 
-                pdb.gimp_free_select(self.img, len(h), h, CHANNEL_OP_ADD, True,\
-                                                         False, 0)
-            elif version[1]  >  start_minver : 
-                pdb.gimp_image_select_polygon(self.img, CHANNEL_OP_ADD, \
-                                                         len(h), h)
-                            
         # Fill the arrowhead(s), PATTERN_FILL work too
-        pdb.gimp_edit_fill(self.layer, FOREGROUND_FILL)
-        pdb.gimp_selection_none(self.img)
+        self.plan.fill(FOREGROUND_FILL, points)
+        return
+
+    def new_layer(self, name) :
+        """
+         Add a layer to draw on, sized later to the arrow by 'fit_layer()'
+        """
+        layer = gimp.Layer(self.img, name, 1, 1, RGBA_IMAGE, 100, NORMAL_MODE)
+        self.img.add_layer(layer, 0)
+        self.layer_box = (0, 0, 1, 1)   # x, y, width, height of the layer
+        self.drawn_box = None           # box of the arrow drawn on the layer
+        self.drawn_key = None           # values of that arrow
+        return layer
+
+    def fit_layer(self, box) :
+        """
+         Move and resize the layer to hold 'box' (clipped to the canvas) then
+         erase the previous arrow. Memory and clearing follow the arrow size,
+         not the image size.
+        """
+        x, y, w, h = box
+        x0 = min(max(0, x), self.img.width - 1)
+        y0 = min(max(0, y), self.img.height - 1)
+        w = max(1, min(self.img.width, x + w) - x0)
+        h = max(1, min(self.img.height, y + h) - y0)
+        lx, ly, lw, lh = self.layer_box
+        inside = lx <= x0 and ly <= y0 and lx + lw >= x0 + w and ly + lh >= y0 + h
+        if not inside or lw*lh > 4*w*h :
+            # a slack of a quarter on each side to avoid a resize at each drag step
+            lx, ly = max(0, x0 - w/4), max(0, y0 - h/4)
+            lw = min(self.img.width, x0 + w + w/4) - lx
+            lh = min(self.img.height, y0 + h + h/4) - ly
+            pdb.gimp_layer_resize(self.layer, lw, lh, 0, 0)
+            self.layer.set_offsets(lx, ly)
+            self.layer_box = (lx, ly, lw, lh)
+            self.layer.fill(TRANSPARENT_FILL)
+        elif self.drawn_box :
+            # dirty rectangle: the old arrow box, the rest is still transparent
+            self.clear_box(self.drawn_box)
+        self.drawn_box = (x0, y0, w, h)
+        return
+
+    def clear_box(self, box) :
+        # clear only the part 'box' of the layer
+        x, y, w, h = box
+        lx, ly, lw, lh = self.layer_box
+        if w*h*2 > lw*lh :
+            # close to the whole layer, a fill is cheaper than select and clear
+            self.layer.fill(TRANSPARENT_FILL)
+            return
+        self.plan.clear(box)
         return
 
     def next_seg(self, btn, data=None) :
@@ -846,11 +1071,9 @@ class ArrowWindow(gtk.Window):
                 # check if there is an under layer and merge
                 if len(self.img.layers) > 1 :
                     self.img.raise_layer_to_top(self.layer)
-                    layer = self.img.merge_down(self.layer, 1)
+                    layer = self.img.merge_down(self.layer, EXPAND_AS_NECESSARY)
                 else : self.terminate(_("layer to merge with"))
-            self.layer = gimp.Layer(self.img, "AC_segment", self.img.width, \
-                self.img.height, RGBA_IMAGE, 100, NORMAL_MODE)
-            self.img.add_layer(self.layer, 0)
+            self.layer = self.new_layer("AC_segment")
             if self.choice_i == 2 :
                 measurements.append((self.arrow_cr, self.segment_cr, \
                                      self.l_arrow, self.theta))
@@ -885,16 +1108,14 @@ class ArrowWindow(gtk.Window):
                 # check if there is an under layer and merge
                 if len(self.img.layers) > 1 : 
                     self.img.raise_layer_to_top(self.layer)
-                    layer = self.img.merge_down(self.layer, 1)
+                    layer = self.img.merge_down(self.layer, EXPAND_AS_NECESSARY)
                 else : self.terminate(_("layer to merge with"))
                 if not self.segment_cr%2 : self.direct = not self.direct
                 self.segment_cr = 1
             self.arrow_cr += 1
             self.label2.set_label(stub%(self.segment_cr, self.arrow_cr) + \
                                   self.states[4])
-            self.layer = gimp.Layer(self.img, _("AC_arrow #")+str(self.arrow_cr),\
-                self.img.width, self.img.height, RGBA_IMAGE, 100, NORMAL_MODE)
-            self.img.add_layer(self.layer, 0)
+            self.layer = self.new_layer(_("AC_arrow #")+str(self.arrow_cr))
             pdb.gimp_displays_flush()
             prompt_line = _("  Next arrow: click on the anchors and drag them")\
                 +_("\nto the desired places. If you mistakenly create a new")\
@@ -923,11 +1144,9 @@ def mssgBox(mess):
 ### Main procedure #############################################################
             
 def arrows_creator(image, layer):
-    global arrow_done, init_paths, ID_path, inter_val, brush_name
+    global arrow_done, init_paths, ID_path, ac_brush, pdb, profiler
 
     if message: gimp.message(message)
-    wdth = image.width
-    hght = image.height
 
     # with gimpshelf avoid duplicate launch
     if shelf.has_key('arrows_creator') and shelf['arrows_creator']:
@@ -937,6 +1156,9 @@ def arrows_creator(image, layer):
         #1) Preparations
         # ********************************************
         shelf['arrows_creator'] = True
+        if argmenu[3] :
+            # every 'pdb' call of this module goes through the profiler
+            profiler = pdb = ProfiledPDB(pdb)
 
         # instability of GIMP-2.6 core with 'image.undo_group' here but work in 2.8
         if version[1] > 7 : image.disable_undo()
@@ -948,21 +1170,8 @@ def arrows_creator(image, layer):
             vectors_new = pdb.gimp_vectors_new(image, _("AC buffer"))
             pdb.gimp_image_add_vectors(image, vectors_new, -1)
 
-        # configure time interval in timeout_add(), probably depends on image size &
-            # sluggishness? Greater interval: more time for GIMP? Approximation.
-        slug = 1.0 # Linux 64 bits, 4 cores at 2.83 GHz, GIMP 2.6.11 (64 b)
-        #slug = 1.4 # Win_7 64 bits, 8 cores at 2 GHz, GIMP 2.6.11 (32 b)
-        inter_val = int((0.26*math.sqrt(wdth*hght) + 100)*slug)
-        
         # generated brush
-        previous_brush = pdb.gimp_context_get_brush()
-        #brush_name = pdb.gimp_brush_duplicate(bru_con_nam) #next line gives less surprise
-        brush_name = pdb.gimp_brush_new('AC_brush')
-        pdb.gimp_brush_set_shape(brush_name, 0)
-        pdb.gimp_brush_set_hardness(brush_name, 1.0)
-        pdb.gimp_context_set_brush(brush_name)
-        if version[1]  >  start_minver: pdb.gimp_context_set_dynamics("Dynamics Off")
-        
+        ac_brush = BrushSession()
 
         #2) Main event    
         # ********************************************
@@ -972,8 +1181,7 @@ def arrows_creator(image, layer):
         #3) Closing
         # ********************************************
         # cleanup brush
-        pdb.gimp_context_set_brush(previous_brush)
-        pdb.gimp_brush_delete(brush_name)
+        ac_brush.close()
 
         if image in gimp.image_list():
             # cleanup path
@@ -1010,8 +1218,136 @@ def arrows_creator(image, layer):
                                         str(arrow[1]), arrow[2], arrow[3])
                 gimp.message(mess_txt)
 
+        if profiler :
+            pdb = profiler.pdb
+            prof_name = sys_file(folder+sep+'profile-%s.json'\
+                %time.strftime("%Y%m%d-%H%M%S"))
+            stats = r.tracker.stats
+            profiler.dump(prof_name, {'measurements': measurements,\
+                'tracking': {'active': stats['active'], 'idle': stats['idle'],\
+                'calls': r.tracker.calls}})
+            profiler = None
+            print("ArrowsCreator profile in '%s'\n%s"%(prof_name, r.tracker.summary()))
+
         shelf['arrows_creator'] = False
 
+### Batch procedure ############################################################
+
+# columns of an arrow in a coordinate file, 'value' (slider3) is optional
+spec_keys = ('x1', 'y1', 'x2', 'y2', 'style', 'head_size', 'angle', 'value')
+
+def read_arrows(file_name):
+    """
+     Arrow specs from a JSON file (list of lists or of objects with 'spec_keys')
+     or a CSV file (a header line and lines beginning by '#' are skipped).
+     Return (specs, skipped) where a spec is a tuple in 'spec_keys' order and
+     'skipped' counts the stroke path arrows and the ones shorter than 2 px.
+    """
+    f = open(file_name, 'r')
+    if file_name.lower().endswith('.json') :
+        rows = json.load(f)
+    else :
+        rows = [row for row in csv.reader(f) if row and\
+                not row[0].strip().startswith('#')]
+    f.close()
+    specs = []
+    skipped = 0
+    for row in rows :
+        if isinstance(row, dict) :
+            row = [row[k] for k in spec_keys if k in row]
+        try : row = [float(v) for v in row]
+        except ValueError :
+            # a header
+            continue
+        if len(row) < 7 : raise ValueError(_("not enough values in %s")%row)
+        row[4] = int(row[4])
+        # the default third slider of the window for that style
+        if len(row) == 7 :
+            if row[4] > 3 : row.append(50)
+            else : row.append(0)
+        x1, y1, x2, y2 = row[:4]
+        if not 0 <= row[4] < 6 or (abs(x2 - x1) < 2 and\
+                abs(y2 - y1) < 2) :
+            skipped += 1
+            continue
+        specs.append(tuple(row[:8]))
+    return specs, skipped
+
+def arrows_creator_batch(image, layer, file_name, brush):
+    """
+     Draw the arrows of a coordinate file on one new layer. The geometry of all
+     the arrows is computed in one pass by 'batch_geometry()'; the rendering is
+     one 'RenderPlan' for the whole file, arrow after arrow as if drawn one at
+     a time, with one layer, one brush and the consecutive fills merged.
+    """
+    start = time.time()
+    try : specs, skipped = read_arrows(file_name)
+    except (IOError, ValueError, KeyError) as err :
+        gimp.message(_("ERROR: can't read arrows from '%s'\n%s")%(file_name, err))
+        return
+    if not specs :
+        gimp.message(_("No straight arrow in '%s'.")%file_name)
+        return
+    batch = batch_geometry(specs)
+    t_geometry = time.time() - start
+
+    pdb.gimp_image_undo_group_start(image)
+    try :
+        gimp.progress_init(_("Drawing %d arrows")%len(specs))
+
+        # one layer on the union of the arrow boxes, clipped to the canvas
+        boxes = [bounding_box(spec[:4], spec[4], spec[5], brush, spec[7])\
+                 for spec in specs]
+        x0 = max(0, min(b[0] for b in boxes))
+        y0 = max(0, min(b[1] for b in boxes))
+        w = max(1, min(image.width, max(b[0] + b[2] for b in boxes)) - x0)
+        h = max(1, min(image.height, max(b[1] + b[3] for b in boxes)) - y0)
+        arrow_layer = gimp.Layer(image, _("AC_arrows batch"), w, h, RGBA_IMAGE, 100,\
+                                 NORMAL_MODE)
+        image.add_layer(arrow_layer, 0)
+        arrow_layer.set_offsets(x0, y0)
+        arrow_layer.fill(TRANSPARENT_FILL)
+
+        # arrow after arrow in the painting order of 'ArrowWindow.arrow_sel()',
+        # as drawn one at a time; the plan merges the consecutive fills
+        ac_brush = BrushSession(brush)
+        plan = RenderPlan(image, arrow_layer, ac_brush, (x0, y0))
+        for i, spec in enumerate(specs) :
+            x1, y1, x2, y2, style, head_size, angle, slider3 = spec
+            heads = batch.head_bool[i] and batch.heads[i]
+            # assegai heads are under the shaft
+            if heads and style == 0 : plan.fill(FOREGROUND_FILL, heads)
+            if batch.ratio[i] < 1.0 or not batch.head_bool[i] :
+                l_arrow, l_head = batch.length[i], batch.l_head[i]
+                value = four_var(style, slider3, l_arrow, l_head, version[1])
+                shaft = shaft_shapes(x1, y1, x2, y2, style, batch.strokes[i], l_arrow,\
+                    l_head, brush, slider3, value, True, version[1])
+                if shaft.polygon :
+                    # the selection of this shaft only
+                    clip = plan.selection((shaft.polygon,))
+                    plan.paint(shaft.strokes, shaft.gradient, selection=clip)
+                elif style == 4 :
+                    if shaft.circle : plan.outline((shaft.circle,), 1.5)
+                    elif shaft.mark : plan.paint((shaft.mark,))
+                    plan.paint(shaft.strokes, fade=shaft.gradient)
+                else :
+                    plan.paint(shaft.strokes, shaft.gradient)
+                    if shaft.rivet : plan.dab((shaft.rivet,), brush/3.0)
+                    # the disk joint over this shaft only
+                    if shaft.circle : plan.fill(BACKGROUND_FILL, ellipses=(shaft.circle,))
+            if heads and style : plan.fill(FOREGROUND_FILL, heads)
+        gimp.progress_update(0.2)
+        with ac_brush :
+            plan.run()
+    finally :
+        pdb.gimp_image_undo_group_end(image)
+    pdb.gimp_displays_flush()
+    gimp.progress_update(1.0)
+    if argmenu[3] :
+        gimp.message(_("ArrowsCreator batch: %d arrows (%d skipped), geometry %.3f s,")\
+            %(len(specs), skipped, t_geometry)+_(" total %.3f s, %d PDB calls to draw")\
+            %(time.time() - start, plan.calls + ac_brush.calls))
+
 ### Choosing menu path #########################################################
 
 sep = os.sep
@@ -1048,7 +1384,7 @@ class MenuArrowsCreator(gtk.Window):
         vbox.pack_start(separator, expand=False)
 
         # rows number in the following table depends of the return dict.
-        table = gtk.Table(rows=3, columns=2, homogeneous=False)
+        table = gtk.Table(rows=4, columns=2, homogeneous=False)
         table.set_col_spacings(10)
         vbox.add(table)
 
@@ -1085,6 +1421,15 @@ class MenuArrowsCreator(gtk.Window):
         self.style_init.set_has_tooltip(True)
         self.style_init.set_tooltip_text(_(" Choose the beginning arrow style."))
         table.attach(self.style_init, 1, 2, 2, 3, xoptions=gtk.FILL, yoptions=0)
+
+        # profiling of the drawing, off by default
+        self.profile = gtk.CheckButton(_("profile the drawing"))
+        self.profile.set_active(argmenu[3])
+        self.profile.set_has_tooltip(True)
+        self.profile.set_tooltip_text(_(" Time the PDB calls and the redraws, written")\
+            +_(" at close in a JSON file\nin '%s'; the last value of the")%folder\
+            +_(" configuration file (0 or 1) sets it later."))
+        table.attach(self.profile, 1, 2, 3, 4, xoptions=gtk.FILL, yoptions=0)
         
         separator = gtk.HSeparator()
         vbox.pack_start(separator, expand=False)
@@ -1105,14 +1450,14 @@ class MenuArrowsCreator(gtk.Window):
     def press_ok(self, data=None) :
         global argmenu, plugin_name
         argmenu = [self.entry1.get_text(), self.entry.get_text(), \
-            int(self.style_init.get_value())]
+            int(self.style_init.get_value()), int(self.profile.get_active())]
         self.btnc.connect("released", gtk.main_quit)
         self.destroy()
 
 # folder name to save the configuration is the same as the plug-in file
 fold_name = fi[fi.rfind(sep)+1:fi.rfind('.')]
-# next is the starting name, menu_path and values of arrow style default
-argmenu = [_("Arrows crea_tor..."), _("/Extensions/Plugins-Python/Tools"), 0]
+# next is the starting name, menu_path, values of arrow style default and profiling
+argmenu = [_("Arrows crea_tor..."), _("/Extensions/Plugins-Python/Tools"), 0, 0]
 
 # config values from data file
 folder = os.path.dirname(os.path.abspath(fi))+sep+fold_name
@@ -1124,6 +1469,7 @@ if os.path.isfile(file_shelf):
     data = open(file_shelf, 'r')
     argmenu = eval(data.read())
     if len(argmenu) == 2: argmenu.append(0)
+    if len(argmenu) == 3: argmenu.append(0)
     data.close()
 
 # no 'menu_path' file, configure 'argmenu' and save
@@ -1162,4 +1508,27 @@ register(
          domain=( "ArrowsCreator", locale_directory)
         )
 
+register(
+         "arrows_creator_batch",
+         _("Draw the arrows of a CSV or JSON coordinate file on a new layer.")\
+             +_( "\nFrom: ")+fi,
+         "Each line is x1, y1, x2, y2, style (0 to 5), head size, wing angle "\
+             +"and optionally the third slider value; the head is at x2, y2.",
+         "R. Brizard",
+         "(c) Robert Brizard",
+         "2011",
+         _("Arrows from a _file..."),
+         "*",
+         [
+          (PF_IMAGE, "image", "IMAGE:", None),
+          (PF_DRAWABLE, "layer", "DRAWABLE:", None),
+          (PF_FILE, "file_name", _("Coordinate file (CSV or JSON)"), ""),
+          (PF_SPINNER, "brush", _("Brush size (radius,PX)"), 11, (1, 25, 1))
+         ],
+         [],
+         arrows_creator_batch,
+         menu = "<Image>"+argmenu[1],
+         domain=( "ArrowsCreator", locale_directory)
+        )
+
 main()
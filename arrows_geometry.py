@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+
+"""
+ Arrow geometry for 'ArrowsCreator', without GIMP.
+
+================================================================================
+ From the two anchors and the style values of the 'ArrowsCreator' window, it
+ computes the head polygons, the shaft strokes and the selection shapes of an
+ arrow. The results are tuples (namedtuple) so they can be compared, cached
+ and benchmarked; the plug-in only does the PDB rendering calls with them.
+ Coordinates are in image pixels. Style numbers are the ones of the plug-in:
+     0 assegai, 1 square cut, 2 measuring, 3 notched, 4 labelling,
+     5 disk joint, 6 stroke path.
+
+================================================================================
+ You may use and distribute this module under the terms of the GPL 2 or greater.
+"""
+
+import math
+from collections import namedtuple
+
+try:
+    import numpy
+except ImportError:
+    # 'batch_geometry()' does the same per arrow
+    numpy = None
+
+# 'heads' is a tuple of polygons (flat coordinates), 'strokes' the shaft stroke
+Arrow = namedtuple('Arrow', 'length theta l_head heads head_bool strokes ratio'\
+    ' draw_shaft shaft')
+# what the shaft painter of a style needs, None for the unused fields:
+#   strokes   paint-brush strokes in painting order (4 coordinates each)
+#   gradient  gradient length of those strokes (or fade for the labelling style)
+#   polygon   selection clipping the strokes
+#   circle    ellipse box (x, y, width, height) of a tail disk or circle
+#   rivet     point (x, y) painted with a third of the brush at the shaft end
+#   mark      point (x, y) painted when the labelling circle is too small
+#   stop      ellipse box around the head where the path stroke must stop
+Shaft = namedtuple('Shaft', 'strokes gradient polygon circle rivet mark stop')
+# lists with one item per arrow of a batch, see 'batch_geometry()'
+Batch = namedtuple('Batch', 'length l_head heads head_bool strokes ratio')
+
+def head_straight(x1, y1, x2, y2, theta, style, head_size, wing_angle):
+    """
+    Head polygon(s) for a straight arrow with apex at (x2, y2) and direction
+    'theta' in radian. Return (heads, l_head) where 'l_head' is the actual
+    length of the triangular head in the shaft direction.
+    """
+    aangle = wing_angle * math.pi / 180.
+    dxm = int(head_size * math.cos(theta - aangle))
+    dym = int(head_size * math.sin(theta - aangle))
+    dxp = int(head_size * math.cos(theta + aangle))
+    dyp = int(head_size * math.sin(theta + aangle))
+    head = (x2, y2, x2 - dxm, y2 - dym, x2 - dxp, y2 - dyp)
+    l_head = math.hypot(x2 - (head[2] + head[4])/2.0, y2 - (head[3] + head[5])/2.0)
+    # 4 apex head, so add one apex on arrow line
+    if style == 0 or style == 3 :
+        if style == 0 : shape = 1.5
+        else :          shape = 0.75
+        dxa = int(l_head * shape * math.cos(theta))
+        dya = int(l_head * shape * math.sin(theta))
+        head = (x2, y2, x2 - dxm, y2 - dym, x2 - dxa, y2 - dya, x2 - dxp, y2 - dyp)
+    heads = (head,)
+    # double triangular headed
+    if style == 2 :
+        heads += ((x1, y1, x1 + dxm, y1 + dym, x1 + dxp, y1 + dyp),)
+    return heads, l_head
+
+# Gauss-Legendre nodes and weights on [-1, 1] for the arc length, 5 points
+gauss_nodes = ((0.0, 0.5688888888888889),
+               (-0.5384693101056831, 0.4786286704993665),
+               (0.5384693101056831, 0.4786286704993665),
+               (-0.9061798459386640, 0.2369268850561891),
+               (0.9061798459386640, 0.2369268850561891))
+
+def bezier_controls(coords):
+    """
+    The 4 control points of the cubic of a two anchors stroke from its 12
+    coordinates (handle, anchor, handle for each anchor).
+    """
+    return ((coords[2], coords[3]), (coords[4], coords[5]),
+            (coords[6], coords[7]), (coords[8], coords[9]))
+
+def bezier_point(controls, t):
+    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = controls
+    u = 1.0 - t
+    a, b, c, d = u*u*u, 3.0*u*u*t, 3.0*u*t*t, t*t*t
+    return (a*x0 + b*x1 + c*x2 + d*x3, a*y0 + b*y1 + c*y2 + d*y3)
+
+def bezier_length(controls, t0=0.0, t1=1.0, pieces=8):
+    """
+    Arc length of the cubic between 't0' and 't1', Gauss-Legendre quadrature
+    on 'pieces' intervals (exact to a small fraction of pixel for the usual
+    handles, the speed is smooth).
+    """
+    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = controls
+    # derivative = 3*(u*u*A + 2*u*t*B + t*t*C)
+    ax, ay = x1 - x0, y1 - y0
+    bx, by = x2 - x1, y2 - y1
+    cx, cy = x3 - x2, y3 - y2
+    half = (t1 - t0)/(2.0*pieces)
+    length = 0.0
+    for piece in range(pieces) :
+        middle = t0 + (2*piece + 1)*half
+        for node, weight in gauss_nodes :
+            t = middle + node*half
+            u = 1.0 - t
+            dx = u*u*ax + 2.0*u*t*bx + t*t*cx
+            dy = u*u*ay + 2.0*u*t*by + t*t*cy
+            length += weight*math.hypot(dx, dy)
+    return 3.0*half*length
+
+def head_bezier(controls, x2, y2, l_head_th, wing_angle, direct, tolerance=0.01):
+    """
+    Head polygon for a stroke path arrow with apex at (x2, y2), the end of the
+    cubic 'controls' (its start if not 'direct'). The head base is the first
+    point of the curve, from the apex, at the distance 'l_head_th' of the apex:
+    a scan in steps of a quarter of head along the curve then a bisection to
+    'tolerance' pixel. Return (heads, l_head).
+    """
+    if direct : t_apex, t_far = 1.0, 0.0
+    else : t_apex, t_far = 0.0, 1.0
+    chord = lambda point: math.hypot(x2 - point[0], y2 - point[1])
+    steps = max(8, int(4*bezier_length(controls)/l_head_th) + 1)
+    t_in = t_apex
+    t_out = None
+    for step in range(1, steps + 1) :
+        t = t_apex + (t_far - t_apex)*step/float(steps)
+        if chord(bezier_point(controls, t)) >= l_head_th :
+            t_out = t
+            break
+        t_in = t
+    if t_out == None :
+        # the curve is shorter than the head, the base is at the tail
+        x_point, y_point = bezier_point(controls, t_far)
+    else :
+        point_in = bezier_point(controls, t_in)
+        point_out = bezier_point(controls, t_out)
+        for halving in range(60) :
+            if math.hypot(point_out[0] - point_in[0], point_out[1] - point_in[1])\
+                    <= tolerance : break
+            t = (t_in + t_out)/2.0
+            point = bezier_point(controls, t)
+            if chord(point) >= l_head_th : t_out, point_out = t, point
+            else : t_in, point_in = t, point
+        x_point, y_point = point_out
+    l_head_new = chord((x_point, y_point))
+    if l_head_new == 0 : return (), 0.0
+    width_arrow = l_head_new * math.tan(wing_angle * math.pi / 180.)
+    deltaX = width_arrow*(y2 - y_point)/l_head_new
+    deltaY = width_arrow*(x2 - x_point)/l_head_new
+    head = (x2, y2, round(x_point + deltaX), round(y_point - deltaY),
+            round(x_point - deltaX), round(y_point + deltaY))
+    l_head = math.hypot(x2 - (head[2] + head[4])/2.0, y2 - (head[3] + head[5])/2.0)
+    return (head,), l_head
+
+def shaft_coord(x1, y1, x2, y2, style, l_head, l_arrow, slider3):
+    """
+    Shaft stroke, shortened by the head(s), and the ratio head/arrow length
+    (>= 1 means no shaft if there is a head). Return (strokes, ratio).
+    """
+    strokes = [x1, y1, x2, y2]
+    dx = x2 - x1
+    dy = y2 - y1
+    ratio = l_head / l_arrow
+    if style != 6 :
+        # don't go quite all the way to the end for style != 3,
+        #   because of overshoot of shaft.
+        if ratio != 0 and ratio < 1.0 :
+            # a head at the end except for notched arrow where shaft is arrowlength
+            if style != 3 :
+                # from similar triangles
+                lcx = int(ratio*dx)
+                lcy = int(ratio*dy)
+                strokes[2] -= lcx
+                strokes[3] -= lcy
+            # a head at the beginning
+            if style == 2 :
+                strokes[0] += lcx
+                strokes[1] += lcy
+                ratio *= 2.0
+        # next is independant of arrow head size
+        if slider3 < 0 and ratio < 1.0 :
+            # inverse gradient
+            strokes = [strokes[2], strokes[3], strokes[0], strokes[1]]
+    return tuple(strokes), ratio
+
+def four_var(style, slider3, l_arrow, l_head, gimp_minor=8):
+    """
+    Fourth value of the shaft painters: gradient length (styles 0 to 3), fade
+    (style 4) or tail circle radius (styles 5, 6).
+    """
+    value = 0
+    if abs(slider3) > 0 and style < 4 :
+        # length of the gradient cycle wanted in 2.6, not in 2.8?
+        if gimp_minor == 6 : value = (l_arrow - l_head)/abs(slider3)
+        else : value = (l_arrow - l_head)/math.sqrt(abs(slider3))
+    elif style == 4 :
+        value = (l_arrow - l_head)*1.3
+    elif style > 4 :
+        if slider3 < int(l_arrow - l_head) : value = slider3
+    return value
+
+def shaft_shapes(x1, y1, x2, y2, style, strokes, l_arrow, l_head, brush, slider3,
+                 value, direct=True, gimp_minor=8):
+    """
+    The 'Shaft' of a style, 'value' is the result of 'four_var()'.
+    """
+    strokes = tuple(strokes)
+    # the selections start from the first anchor placed, not from the tail
+    if direct : sign = 1
+    else : sign = -1
+    polygon = circle = rivet = mark = stop = None
+    gradient = value
+    if style == 0 :
+        # paint-brush stroke after the head and a rivet at shaft-head
+        if slider3 >= 0 : rivet = strokes[2:4]
+        else : rivet = strokes[0:2]
+        paint = (strokes,)
+    elif style == 1 :
+        # a selection to square cut the stroke
+        deltaX = round(brush*(y2 - y1)*sign/l_arrow)
+        deltaY = round(brush*(x2 - x1)*sign/l_arrow)
+        polygon = (strokes[2] + deltaX, strokes[3] - deltaY,
+                   strokes[2] - deltaX, strokes[3] + deltaY,
+                   strokes[0] - deltaX, strokes[1] + deltaY,
+                   strokes[0] + deltaX, strokes[1] - deltaY)
+        paint = (strokes,)
+    elif style == 2 :
+        # measuring arrow: X width of shaft, two half strokes from the centre
+        width_sel = brush*1.5
+        deltaX = round(width_sel*(y2 - y1)*sign/l_arrow)
+        deltaY = round(width_sel*(x2 - x1)*sign/l_arrow)
+        polygon = (strokes[2] + deltaX, strokes[3] - deltaY,
+                   strokes[2] - deltaX, strokes[3] + deltaY,
+                   strokes[0] + deltaX, strokes[1] - deltaY,
+                   strokes[0] - deltaX, strokes[1] + deltaY)
+        x_center = (strokes[0] + strokes[2])/2.0
+        y_center = (strokes[1] + strokes[3])/2.0
+        if slider3 > 0 :
+            paint = ((x_center, y_center, strokes[0], strokes[1]),
+                     (x_center, y_center, strokes[2], strokes[3]))
+        else :
+            paint = ((strokes[0], strokes[1], x_center, y_center),
+                     (strokes[2], strokes[3], x_center, y_center))
+    elif style == 3 :
+        # a selection for notched arrow, computed on the unreversed stroke
+        if slider3 < 0 : base = (strokes[2], strokes[3], strokes[0], strokes[1])
+        else : base = strokes
+        deltaX = round(brush*(base[3] - base[1])/l_arrow)
+        deltaY = round(brush*(base[2] - base[0])/l_arrow)
+        polygon = (base[2], base[3],
+                   base[0] - deltaX, base[1] + deltaY,
+                   base[0] + deltaY*0.7, base[1] + deltaX*0.7,
+                   base[0] + deltaX, base[1] - deltaY)
+        paint = (strokes,)
+    elif style == 4 :
+        # labelling arrow: circle at the tail or a mark if too small
+        short_shaft = l_arrow - l_head
+        if slider3 < short_shaft : radius = slider3
+        elif slider3 < 3 : radius = 0
+        else : radius = int(short_shaft)
+        stroke = list(strokes)
+        if radius :
+            circle = (stroke[0] - radius, stroke[1] - radius, 2*radius, 2*radius)
+            stroke[0] += round(radius*(x2 - x1)/l_arrow)
+            stroke[1] += round(radius*(y2 - y1)/l_arrow)
+        else : mark = tuple(stroke[:2])
+        # inverse stroke to have stronger color at head for 2.6
+        if gimp_minor == 6 : stroke = [stroke[2], stroke[3], stroke[0], stroke[1]]
+        paint = (tuple(stroke),)
+    elif style == 5 :
+        # disk joint arrow, reversed stroke with a gradient on the shaft length
+        gradient = l_arrow - l_head
+        paint = ((strokes[2], strokes[3], strokes[0], strokes[1]),)
+        if value :
+            circle = (strokes[0] - value, strokes[1] - value, 2*value, 2*value)
+    else :
+        # stroke path: starting disk and a stop around the head
+        paint = ()
+        if value :
+            circle = (strokes[0] - value, strokes[1] - value, 2.0*value, 2.0*value)
+        if l_head > 0 :
+            stop = (strokes[2] - int(l_head), strokes[3] - int(l_head),
+                    int(2*l_head) - 1, int(2*l_head) - 1)
+    return Shaft(paint, gradient, polygon, circle, rivet, mark, stop)
+
+def arrow_geometry(x1, y1, x2, y2, style, head_size, wing_angle, brush, slider3,
+                   direct=True, gimp_minor=8, controls=None):
+    """
+    Everything to draw an arrow from (x1, y1) to its apex (x2, y2), return an
+    'Arrow'. For the stroke path style give the 4 control points of the stroke
+    'controls', see 'bezier_controls()'.
+    """
+    dx = x2 - x1
+    dy = y2 - y1
+    l_arrow = math.hypot(dx, dy)
+    # arrowhead theoretical length (for the stroke path arrows)
+    l_head_th = head_size * math.cos(wing_angle * math.pi / 180.)
+    # it gives answer 0 to pi and 0 to -pi considering the signs of dy & dx
+    theta = math.atan2(dy, dx)
+
+    if style == 6 and l_head_th > 0 and controls != None :
+        heads, l_head = head_bezier(controls, x2, y2, l_head_th, wing_angle, direct)
+    else :
+        heads, l_head = head_straight(x1, y1, x2, y2, theta, style, head_size,
+                                      wing_angle)
+    # if the 3 points are not colinear, then place a head
+    head_bool = bool(heads) and int(l_head) > 0 and heads[0][2:4] != heads[0][4:6]
+    # if swept wings head
+    if style == 3 :
+        head_bool = head_bool and math.hypot(x2 - heads[0][4], y2 - heads[0][5]) > 1.0
+    strokes, ratio = shaft_coord(x1, y1, x2, y2, style, l_head, l_arrow, slider3)
+
+    draw_shaft = ratio < 1.0 or not head_bool
+    shaft = None
+    if draw_shaft :
+        value = four_var(style, slider3, l_arrow, l_head, gimp_minor)
+        shaft = shaft_shapes(x1, y1, x2, y2, style, strokes, l_arrow, l_head, brush,
+                             slider3, value, direct, gimp_minor)
+    return Arrow(l_arrow, theta * 180 / math.pi, l_head, heads, head_bool, strokes,
+                 ratio, draw_shaft, shaft)
+
+def bounding_box(coords, style, head_size, brush, slider3):
+    """
+    Bounding box (x, y, width, height) of an arrow for the stroke 'coords'
+    (anchors and handles) with a margin for the head, tail circle and brush.
+    """
+    if style == 6 :
+        # the curve is inside the convex hull of its control points
+        xs = coords[0::2]
+        ys = coords[1::2]
+    else :
+        xs = [coords[2], coords[-4]]
+        ys = [coords[3], coords[-3]]
+    margin = head_size
+    if style > 3 : margin = max(margin, slider3)
+    margin = int(margin + 1.5*brush) + 2
+    x = int(min(xs)) - margin
+    y = int(min(ys)) - margin
+    return (x, y, int(max(xs)) + margin - x, int(max(ys)) + margin - y)
+
+def batch_geometry(specs):
+    """
+    Heads and shaft strokes of many straight arrows (styles 0 to 5) in one
+    pass. 'specs' is a sequence of (x1, y1, x2, y2, style, head_size,
+    wing_angle, slider3) with the apex at (x2, y2). Return a 'Batch'; the values
+    are the ones of 'arrow_geometry()' for each arrow. With NumPy the math is
+    done on whole columns, without it arrow by arrow.
+    """
+    if not len(specs) : return Batch([], [], [], [], [], [])
+    if numpy == None :
+        result = Batch([], [], [], [], [], [])
+        for x1, y1, x2, y2, style, size, angle, slider3 in specs :
+            l_arrow = math.hypot(x2 - x1, y2 - y1)
+            theta = math.atan2(y2 - y1, x2 - x1)
+            heads, l_head = head_straight(x1, y1, x2, y2, theta, style, size, angle)
+            head_bool = int(l_head) > 0 and heads[0][2:4] != heads[0][4:6]
+            if style == 3 :
+                head_bool = head_bool and \
+                    math.hypot(x2 - heads[0][4], y2 - heads[0][5]) > 1.0
+            strokes, ratio = shaft_coord(x1, y1, x2, y2, style, l_head, l_arrow,\
+                slider3)
+            for field, value in zip(result, (l_arrow, l_head, heads, head_bool,\
+                    strokes, ratio)) :
+                field.append(value)
+        return result
+
+    x1, y1, x2, y2, style, size, angle, slider3 = \
+        numpy.asarray(specs, dtype=float).T
+    dx = x2 - x1
+    dy = y2 - y1
+    l_arrow = numpy.hypot(dx, dy)
+    theta = numpy.arctan2(dy, dx)
+    aangle = angle * math.pi / 180.
+    # the integer truncations of 'head_straight()'
+    dxm = numpy.trunc(size * numpy.cos(theta - aangle))
+    dym = numpy.trunc(size * numpy.sin(theta - aangle))
+    dxp = numpy.trunc(size * numpy.cos(theta + aangle))
+    dyp = numpy.trunc(size * numpy.sin(theta + aangle))
+    l_head = numpy.hypot(x2 - ((x2 - dxm) + (x2 - dxp))/2.0,
+                         y2 - ((y2 - dym) + (y2 - dyp))/2.0)
+    shape = numpy.where(style == 0, 1.5, 0.75)
+    dxa = numpy.trunc(l_head * shape * numpy.cos(theta))
+    dya = numpy.trunc(l_head * shape * numpy.sin(theta))
+    four = (style == 0) | (style == 3)
+    # second apex of the polygon, compared with the first wing for colinearity
+    next_x = numpy.where(four, x2 - dxa, x2 - dxp)
+    next_y = numpy.where(four, y2 - dya, y2 - dyp)
+    head_bool = (numpy.trunc(l_head) > 0) & ((x2 - dxm != next_x) |\
+        (y2 - dym != next_y))
+    head_bool &= (style != 3) | (numpy.hypot(x2 - (x2 - dxa), y2 - (y2 - dya)) > 1.0)
+
+    # shaft stroke as in 'shaft_coord()'
+    ratio = l_head / l_arrow
+    cut = (ratio != 0) & (ratio < 1.0)
+    lcx = numpy.trunc(ratio*dx)
+    lcy = numpy.trunc(ratio*dy)
+    end = cut & (style != 3)
+    sx2 = numpy.where(end, x2 - lcx, x2)
+    sy2 = numpy.where(end, y2 - lcy, y2)
+    double = cut & (style == 2)
+    sx1 = numpy.where(double, x1 + lcx, x1)
+    sy1 = numpy.where(double, y1 + lcy, y1)
+    ratio = numpy.where(double, ratio*2.0, ratio)
+    swap = (slider3 < 0) & (ratio < 1.0)
+    strokes = numpy.column_stack((numpy.where(swap, sx2, sx1),
+        numpy.where(swap, sy2, sy1), numpy.where(swap, sx1, sx2),
+        numpy.where(swap, sy1, sy2)))
+
+    # polygons have different sizes, only their assembly is per arrow
+    rows = lambda *columns : list(zip(*[c.tolist() for c in columns]))
+    quad = rows(x2, y2, x2 - dxm, y2 - dym, x2 - dxa, y2 - dya, x2 - dxp, y2 - dyp)
+    tri = rows(x2, y2, x2 - dxm, y2 - dym, x2 - dxp, y2 - dyp)
+    tail = rows(x1, y1, x1 + dxm, y1 + dym, x1 + dxp, y1 + dyp)
+    heads = []
+    for i, s in enumerate(style.tolist()) :
+        if s == 0 or s == 3 : heads.append((quad[i],))
+        elif s == 2 : heads.append((tri[i], tail[i]))
+        else : heads.append((tri[i],))
+    return Batch(l_arrow.tolist(), l_head.tolist(), heads, head_bool.tolist(),
+                 rows(*strokes.T), ratio.tolist())
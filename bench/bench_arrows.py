@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ Throughput of the arrow geometry: one 'arrow_geometry()' call per arrow, as
+ the interactive 'ArrowsCreator' does, against 'batch_geometry()' used by the
+ 'arrows_creator_batch' procedure. Needs no GIMP, NumPy is optional. The
+ per arrow time includes the shaft shapes, the batch procedure computes them
+ only for the arrows with a shaft.
+
+     python bench/bench_arrows.py [number of arrows] [repeats]
+"""
+
+import os, sys, time, random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import arrows_geometry
+from arrows_geometry import arrow_geometry, batch_geometry
+
+def random_specs(count, seed=0):
+    # styles 0 to 5 with the slider ranges of the plug-in window
+    rand = random.Random(seed)
+    specs = []
+    while len(specs) < count :
+        x1, y1 = rand.randint(0, 4000), rand.randint(0, 3000)
+        x2, y2 = x1 + rand.randint(-400, 400), y1 + rand.randint(-400, 400)
+        if abs(x2 - x1) < 2 and abs(y2 - y1) < 2 : continue
+        style = rand.randint(0, 5)
+        if style > 3 : value = rand.randint(0, 200)
+        else : value = rand.randint(-25, 25)
+        specs.append((x1, y1, x2, y2, style, rand.randint(0, 200),\
+                      rand.randint(1, 80), value))
+    return specs
+
+def per_arrow(specs):
+    return [arrow_geometry(x1, y1, x2, y2, style, size, angle, 11.0, value)\
+            for x1, y1, x2, y2, style, size, angle, value in specs]
+
+def best_time(funct, specs, repeats):
+    best = None
+    for i in range(repeats) :
+        start = time.time()
+        result = funct(specs)
+        lapse = time.time() - start
+        if best is None or lapse < best : best = lapse
+    return best, result
+
+def main():
+    count = 100000
+    repeats = 5
+    if len(sys.argv) > 1 : count = int(sys.argv[1])
+    if len(sys.argv) > 2 : repeats = int(sys.argv[2])
+    specs = random_specs(count)
+
+    t_single, arrows = best_time(per_arrow, specs, repeats)
+    t_batch, batch = best_time(batch_geometry, specs, repeats)
+    numpy = arrows_geometry.numpy
+    arrows_geometry.numpy = None
+    t_loop, loop = best_time(batch_geometry, specs, repeats)
+    arrows_geometry.numpy = numpy
+
+    # same values for every arrow whatever the path
+    for i, arrow in enumerate(arrows) :
+        expected = (arrow.length, arrow.l_head, arrow.heads, arrow.head_bool,\
+                    arrow.strokes, arrow.ratio)
+        for result in (batch, loop) :
+            if tuple(field[i] for field in result) != expected :
+                print("MISMATCH for arrow %s"%(specs[i],))
+                return 1
+
+    print("%d arrows, best of %d, NumPy %s"%(count, repeats,\
+          numpy and numpy.__version__ or "not installed"))
+    for name, lapse in (("arrow_geometry() per arrow", t_single),\
+                        ("batch_geometry()", t_batch),\
+                        ("batch_geometry() without NumPy", t_loop)) :
+        print("  %-32s %8.3f s %10.0f arrows/s  x%.1f"%(name, lapse,\
+              count/lapse, t_single/lapse))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ Size against time of the autosave_a backup codecs: 'write_backup()' of the
+ plug-in (from its zip, on the GIMP stand-in) compresses an uncompressed XCF
+ for each codec installed, in one thread and with a pool of one thread by
+ processor (gzip and zstd only, bzip2 and lz4 are one stream). The file is a
+ real XCF if given, else pixel-like data; the gzip and bzip2 results are read
+ back to check them by the readers of the libraries GIMP loads them with.
+
+     python2 bench/bench_codecs.py [XCF file | size in MB] [threads]
+"""
+
+import os, sys, time, random, shutil, tempfile, bz2, gzip
+from multiprocessing.pool import ThreadPool
+from multiprocessing import cpu_count
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_plugins import load_plugin
+
+def pixel_data(size):
+    """ Flat, gradient and noisy areas of 64 KB, as the layers of an image """
+    rand = random.Random(5)
+    gradient = ''.join([chr(i%256) for i in range(1 << 16)])
+    # noise of 8 levels
+    low = ''.join([chr(i & 7) for i in range(256)])
+    chunks = []
+    for i in range(size >> 16) :
+        kind = rand.randint(0, 2)
+        if kind == 0 : chunks.append(chr(rand.randint(0, 255))*(1 << 16))
+        elif kind == 1 : chunks.append(gradient)
+        else : chunks.append(os.urandom(1 << 16).translate(low))
+    return ''.join(chunks)
+
+def check(ext, original, file_name):
+    # as libbz2 'BZ2_bzread()' BZ2File stops at the end of the first stream,
+    # GzipFile goes on to the next gzip member as zlib 'gzread()'
+    if ext == '.bz2' : f = bz2.BZ2File(file_name)
+    elif ext == '.gz' : f = gzip.GzipFile(file_name)
+    else : return '-'
+    data = f.read()
+    f.close()
+    return data == original and 'ok' or 'BAD'
+
+def main():
+    threads = cpu_count()
+    if len(sys.argv) > 2 : threads = int(sys.argv[2])
+    work = tempfile.mkdtemp(prefix='bench-codecs-')
+    try :
+        au = load_plugin(work, 'autosave_a.py', 'au_codecs')
+        if len(sys.argv) > 1 and os.path.isfile(sys.argv[1]) :
+            f = open(sys.argv[1], 'rb')
+            original = f.read()
+            f.close()
+        else :
+            size = 64
+            if len(sys.argv) > 1 : size = int(sys.argv[1])
+            original = pixel_data(size << 20)
+        raw_name = os.path.join(work, 'dump.xcf')
+        pool = ThreadPool(threads)
+        print("%.1f MB, blocks of %d KB, %d threads"%(len(original)/1048576.0,\
+            au.block_size >> 10, threads))
+        print("  codec     level  size     1 thread   %2d threads  check"%threads)
+        for ext in au.exten :
+            ext = os.path.splitext(ext)[1]
+            if ext not in au.codec_level : continue
+            lapses = []
+            for p, n in ((None, 1), (pool, threads)) :
+                f = open(raw_name, 'wb')
+                f.write(original)
+                f.close()
+                file_name = os.path.join(work, 'backup.xcf' + ext)
+                start = time.time()
+                au.write_backup(raw_name, file_name, p, n)
+                lapses.append(time.time() - start)
+            size = os.path.getsize(file_name)
+            print("  %-8s  %5d  %5.1f %%  %6.2f s    %6.2f s    %s"%(ext,\
+                au.codec_level[ext], 100.0*size/len(original), lapses[0], lapses[1],\
+                check(ext, original, file_name)))
+        pool.close()
+    finally :
+        shutil.rmtree(work, True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ Benchmarks of the plug-ins without GIMP, on the stand-in of 'gimp_standin'.
+
+================================================================================
+ Each plug-in is loaded from a copy in a temporary folder (autosave_a.py is
+ taken from its zip), so their configuration files stay out of the repository.
+ The scenarios drive what a user session does at a large scale:
+     arrows        'ArrowWindow.update()' while dragging the anchors of
+                   1000 arrows of all styles, 'Next arrow' between them
+     arrows_batch  'arrows_creator_batch' on a file of 1000 arrows
+     layers_view   'LayerViewer' on 10000 layers in groups, then selections
+                   in its layer list ('name_change()')
+     layers_thumbs the same with 'Preview': thumbnails, no canvas switches
+     layers_save   'LayerViewer.save_file()' of those layers
+     layers_batch  'info_layers_batch' on a folder of 100 XCF files
+     autosave      'backup_time()' rounds on 100 open images, a third of
+                   them painted between two rounds
+     autosave_tiles the same in the tile store of autosave_a
+ For each one it reports the time, the throughput and the wire calls (PDB
+ calls and image or item attributes) that would go to the GIMP core. With
+ '--save' the results go in a JSON file, with '--compare' they are checked
+ against such a file: a throughput lower or a number of wire calls higher
+ than '--tolerance' is a regression (exit status 1).
+ Python 2 only, as the plug-ins.
+
+     python2 bench/bench_plugins.py [--quick] [--save FILE] [--compare FILE]
+
+================================================================================
+ You may use and distribute this program under the terms of the GPL 2 or greater.
+"""
+
+import os, sys, time, json, random, shutil, tempfile, zipfile, imp, optparse
+
+here = os.path.dirname(os.path.abspath(__file__))
+root = os.path.dirname(here)
+sys.path.insert(0, os.path.join(here, 'gimp_standin'))
+import gimp, gimpfu, gtk, gobject
+from gimpshelf import shelf
+
+### Loading the plug-ins #######################################################
+
+def load_plugin(work, file_name, module_name):
+    """ Copy the plug-in 'file_name' (from the zip for autosave) and import it """
+    path = os.path.join(work, file_name)
+    if file_name == 'autosave_a.py' :
+        archive = zipfile.ZipFile(os.path.join(root, 'autosave_a-0.4.zip'))
+        f = open(path, 'wb')
+        f.write(archive.read(file_name))
+        f.close()
+        archive.close()
+    else : shutil.copy(os.path.join(root, file_name), path)
+    if file_name.startswith('ArrowsCreator') :
+        shutil.copy(os.path.join(root, 'arrows_geometry.py'), work)
+        # the configuration, else the first start window
+        folder = os.path.join(work, file_name[:-3])
+        if not os.path.isdir(folder) : os.mkdir(folder)
+        f = open(os.path.join(folder, 'menu_path'), 'w')
+        f.write(repr(["Arrows crea_tor...", "/Extensions/Plugins-Python/Tools", 0, 0]))
+        f.close()
+    if file_name == 'info_layers.py' :
+        shutil.copy(os.path.join(root, 'layer_walk.py'), work)
+    if work not in sys.path : sys.path.insert(0, work)
+    gtk.current_folder = work
+    return imp.load_source(module_name, path)
+
+### Test images ################################################################
+
+def layer_tree(groups, per_group, singles, info_every=10):
+    """ An image with 'groups' groups of 'per_group' layers and 'singles' layers """
+    img = gimp.Image(2000, 1500, gimpfu.RGB, "layers.xcf", "/tmp/layers.xcf")
+    rand = random.Random(1)
+    count = 0
+    for g in range(groups) :
+        group = gimp.GroupLayer(img, "Group %d"%g)
+        img.insert_layer(group, None, len(img._layers))
+        for i in range(per_group) :
+            layer = gimp.Layer(img, "Layer %d.%d"%(g, i), rand.randint(1, 2000),\
+                rand.randint(1, 1500), gimpfu.RGBA_IMAGE)
+            img.insert_layer(layer, group, len(group._children))
+            count += 1
+            if not count%info_every :
+                layer.attach_new_parasite('layer-info', 1, "note %d"%count)
+    for i in range(singles) :
+        layer = gimp.Layer(img, "Single %d"%i, 2000, 1500, gimpfu.RGB_IMAGE)
+        img.insert_layer(layer, None, len(img._layers))
+    return img
+
+def open_images(count, layers):
+    images = []
+    for i in range(count) :
+        img = gimp.Image(128, 128, gimpfu.RGB, "image%d.xcf"%i,\
+                         "/tmp/images/image%d.xcf"%i)
+        for j in range(layers) :
+            img.insert_layer(gimp.Layer(img, "L%d"%j, 128, 128), None, 0)
+        img.dirty = True
+        images.append(img)
+    return images
+
+def arrow_coords(rand, width, height):
+    # the 12 coordinates of a two anchors stroke, with handles for the curves
+    x1, y1 = rand.randint(50, width - 50), rand.randint(50, height - 50)
+    x2, y2 = x1 + rand.randint(-300, 300), y1 + rand.randint(-300, 300)
+    bend = rand.randint(-80, 80)
+    return [x1, y1, x1, y1, x1 + bend, y1 - bend, x2 - bend, y2 + bend, x2, y2, x2, y2]
+
+### Scenarios ##################################################################
+
+def bench_arrows(work, scale):
+    """ Dragging the head of each arrow in 10 steps, a new arrow layer after """
+    ac = load_plugin(work, 'ArrowsCreator-0.2.py', 'ac_interactive')
+    img = gimp.Image(4000, 3000, gimpfu.RGB, "arrows.xcf")
+    img.insert_layer(gimp.Layer(img, "Background", 4000, 3000, gimpfu.RGB_IMAGE))
+    path = gimp.Vectors(img, "path")
+    img._vectors.append(path)
+    rand = random.Random(2)
+    stroke = path.add_stroke(arrow_coords(rand, 4000, 3000))
+    ac.ac_brush = ac.BrushSession()
+    window = ac.ArrowWindow(img)
+    frames = 0
+    for arrow in range(scale['arrows']) :
+        coords = arrow_coords(rand, 4000, 3000)
+        window.choice_i = arrow%7
+        if window.choice_i > 3 : window.slider3 = 30
+        else : window.slider3 = rand.randint(-5, 5)
+        window.headSize = rand.choice((0, 20, 40, 60))
+        window.changed = True
+        for step in range(10) :
+            coords[8] += 3
+            coords[9] -= 2
+            coords[10], coords[11] = coords[8], coords[9]
+            stroke.set_points(coords)
+            window.update()
+            frames += 1
+        # an idle tick, then the next arrow
+        window.update()
+        window.next_arrow()
+    ac.ac_brush.close()
+    return frames, "frames"
+
+def bench_arrows_batch(work, scale):
+    ac = load_plugin(work, 'ArrowsCreator-0.2.py', 'ac_batch')
+    img = gimp.Image(4000, 3000, gimpfu.RGB, "batch.xcf")
+    layer = gimp.Layer(img, "Background", 4000, 3000, gimpfu.RGB_IMAGE)
+    img.insert_layer(layer)
+    rand = random.Random(3)
+    file_name = os.path.join(work, 'arrows.csv')
+    f = open(file_name, 'w')
+    f.write("x1,y1,x2,y2,style,head size,angle,value\n")
+    for i in range(scale['arrows']) :
+        c = arrow_coords(rand, 4000, 3000)
+        style = i%6
+        f.write("%d,%d,%d,%d,%d,%d,%d,%d\n"%(c[2], c[3], c[8], c[9], style,\
+            rand.choice((0, 20, 40)), rand.randint(10, 60),\
+            (style > 3) and 30 or rand.randint(-5, 5)))
+    f.close()
+    gimpfu.procedures['arrows_creator_batch'](img, layer, file_name, 5.0)
+    return scale['arrows'], "arrows"
+
+def bench_layers_view(work, scale):
+    il = load_plugin(work, 'info_layers.py', 'il_view')
+    groups = scale['layers']//100
+    img = layer_tree(groups, 99, scale['layers'] - 100*groups)
+    viewer = il.LayerViewer(img, img._layers[0])
+    rand = random.Random(4)
+    count = len(viewer.index)
+    for i in range(scale['selections']) :
+        viewer.select(rand.randrange(count))
+    print("    " + viewer.parasites.summary())
+    return scale['selections'] + 1, "selections"
+
+def bench_layers_preview(work, scale):
+    """ The selections of 'layers_view' with 'Preview', each layer seen twice """
+    il = load_plugin(work, 'info_layers.py', 'il_preview')
+    groups = scale['layers']//100
+    img = layer_tree(groups, 99, scale['layers'] - 100*groups)
+    viewer = il.LayerViewer(img, img._layers[0])
+    viewer.show_preview.set_active(True)
+    rand = random.Random(4)
+    count = len(viewer.index)
+    chosen = [rand.randrange(count) for i in range(scale['selections'])]
+    for pos in chosen + chosen :
+        viewer.select(pos)
+    print("    " + viewer.thumbnails.summary())
+    return 2*scale['selections'] + 2, "selections"
+
+def bench_layers_save(work, scale):
+    il = load_plugin(work, 'info_layers.py', 'il_save')
+    groups = scale['layers']//100
+    img = layer_tree(groups, 99, scale['layers'] - 100*groups)
+    viewer = il.LayerViewer(img, img._layers[0])
+    gtk.chosen_filename = os.path.join(work, 'layout.txt')
+    viewer.save_file(viewer.btn)
+    return len(viewer.index), "layers"
+
+def bench_layers_batch(work, scale):
+    il = load_plugin(work, 'info_layers.py', 'il_batch')
+    folder = os.path.join(work, 'xcf')
+    os.mkdir(folder)
+    for i in range(scale['images']) :
+        open(os.path.join(folder, "image%03d.xcf"%i), 'wb').close()
+    files, count = gimpfu.procedures['info_layers_batch'](folder,\
+        os.path.join(work, 'layers.jsonl'), 1, -1)
+    return files, "files"
+
+def autosave_rounds(work, scale, module_name, extension):
+    backups = os.path.join(work, 'backups')
+    os.mkdir(backups)
+    au = load_plugin(work, 'autosave_a.py', module_name)
+    if extension in au.exten : extension = au.exten.index(extension)
+    au.config = {'dir_BU': backups, 'image': 2, 'extension': extension, 'kept': 2,\
+                 'interval(s)': 600.0, 'start': False}
+    images = open_images(scale['images'], 3)
+    for round in range(scale['rounds']) :
+        au.backup_time([images[0]._name, images[0].ID])
+        # the round ends when the threads have written the backups
+        au.writer.wait()
+        for img in images[::3] : img.paint()
+    return scale['images']*scale['rounds'], "images"
+
+def bench_autosave(work, scale):
+    return autosave_rounds(work, scale, 'au_backup', '.xcf.gz')
+
+def bench_autosave_tiles(work, scale):
+    return autosave_rounds(work, scale, 'au_tiles', '.tiles.json')
+
+scenarios = [('arrows', bench_arrows), ('arrows_batch', bench_arrows_batch),\
+             ('layers_view', bench_layers_view), ('layers_thumbs', bench_layers_preview),\
+             ('layers_save', bench_layers_save),\
+             ('layers_batch', bench_layers_batch), ('autosave', bench_autosave),\
+             ('autosave_tiles', bench_autosave_tiles)]
+
+full_scale = {'arrows': 1000, 'layers': 10000, 'selections': 20, 'images': 100,\
+              'rounds': 20}
+quick_scale = {'arrows': 100, 'layers': 1000, 'selections': 5, 'images': 10,\
+               'rounds': 3}
+
+### Running and reporting ######################################################
+
+def run(name, scenario, scale):
+    gimp.reset()
+    shelf.clear()
+    gobject.sources.clear()
+    work = tempfile.mkdtemp(prefix='bench-%s-'%name)
+    try :
+        start = time.time()
+        count, unit = scenario(work, scale)
+        lapse = time.time() - start
+    finally :
+        shutil.rmtree(work, True)
+        if work in sys.path : sys.path.remove(work)
+    wire = gimp.wire_total()
+    return {'count': count, 'unit': unit, 'seconds': lapse,\
+            'per_s': count/max(lapse, 1e-9), 'wire_calls': wire,\
+            'wire_per_op': wire/float(max(count, 1))}
+
+def compare(results, baseline, tolerance):
+    """ Lines of the comparison and the names of the regressed scenarios """
+    lines = []
+    regressed = []
+    for name, result in results.items() :
+        base = baseline.get(name)
+        if not base :
+            continue
+        speed = result['per_s']/base['per_s']
+        wire = result['wire_calls']/float(max(base['wire_calls'], 1))
+        flag = ''
+        if speed < 1.0 - tolerance or wire > 1.0 + tolerance :
+            flag = '  REGRESSION'
+            regressed.append(name)
+        lines.append("  %-13s throughput x%.2f, wire calls x%.2f%s"\
+            %(name, speed, wire, flag))
+    return lines, regressed
+
+def main():
+    parser = optparse.OptionParser(usage="%prog [options]")
+    parser.add_option('--quick', action='store_true', help="a tenth of the scale")
+    parser.add_option('--only', help="comma separated scenario names")
+    parser.add_option('--latency', type='float', default=0.0,\
+                      help="microseconds added to each wire call")
+    parser.add_option('--gimp', default='2.8', help="GIMP version, 2.6 or 2.8")
+    parser.add_option('--save', help="write the results in this JSON file")
+    parser.add_option('--compare', help="JSON file of a previous run")
+    parser.add_option('--tolerance', type='float', default=0.2,\
+                      help="relative change taken as a regression")
+    options, args = parser.parse_args()
+
+    gimp.latency = options.latency/1e6
+    gimp.version = tuple(int(v) for v in options.gimp.split('.')) + (14,)
+    scale = options.quick and quick_scale or full_scale
+    names = [name for name, scenario in scenarios]
+    if options.only : names = options.only.split(',')
+
+    results = {}
+    print("GIMP stand-in %s, wire latency %.0f us, scale %s"%(options.gimp,\
+          options.latency, options.quick and 'quick' or 'full'))
+    for name, scenario in scenarios :
+        if name not in names : continue
+        result = run(name, scenario, scale)
+        results[name] = result
+        print("  %-13s %8.3f s %10.1f %s/s %9d wire calls (%.1f per %s)"\
+            %(name, result['seconds'], result['per_s'], result['unit'],\
+              result['wire_calls'], result['wire_per_op'], result['unit'][:-1]))
+
+    status = 0
+    if options.compare :
+        f = open(options.compare)
+        baseline = json.load(f)
+        f.close()
+        lines, regressed = compare(results, baseline, options.tolerance)
+        print("Compared with '%s':"%options.compare)
+        for line in lines : print(line)
+        if regressed : status = 1
+    if options.save :
+        f = open(options.save, 'w')
+        json.dump(results, f, indent=1, sort_keys=True)
+        f.close()
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,644 @@
+# -*- coding: utf-8 -*-
+
+"""
+ Stand-in of the 'gimp' module of GIMP-Python, for the benchmarks.
+
+================================================================================
+ Images, layer trees, vectors and parasites are plain Python objects. What is a
+ wire message to the GIMP core in the real module (a PDB call or an attribute
+ of an image or item) goes through 'wire()': it is counted by name in 'calls'
+ and waits 'latency' seconds, so a benchmark measures the plug-in work and the
+ number of round trips it would cost.
+ 'pdb' procedures without a model here do nothing and return None.
+
+================================================================================
+ You may use and distribute this module under the terms of the GPL 2 or greater.
+"""
+
+import os, time, bz2, gzip
+
+version = (2, 8, 14)
+# seconds added to each wire call, 0 to measure only the plug-in side
+latency = 0.0
+# wire calls by procedure or attribute name
+calls = {}
+# 'message()' texts
+messages = []
+# pixel-like content of the files and tiles, compressible as images are
+file_block = b''.join([chr((i*i >> 4)%251) for i in range(4096)])
+# layers of an image from 'gimp_file_load', in groups of 10
+file_layers = 50
+
+images = []
+last_id = [0]
+
+def wire(name):
+    calls[name] = calls.get(name, 0) + 1
+    if latency : time.sleep(latency)
+
+def reset():
+    """ Forget the images, the counters and the messages """
+    del images[:]
+    calls.clear()
+    del messages[:]
+
+def wire_total():
+    return sum(calls.values())
+
+def new_id():
+    last_id[0] += 1
+    return last_id[0]
+
+def image_list():
+    wire('gimp_image_list')
+    return list(images)
+
+def message(text):
+    wire('gimp_message')
+    messages.append(text)
+
+def progress_init(text=None):
+    wire('gimp_progress_init')
+
+def progress_update(fraction):
+    wire('gimp_progress_update')
+
+### Model ######################################################################
+
+class Parasite(object):
+    def __init__(self, name, flags, data):
+        self.name = name
+        self.flags = flags
+        # GIMP keeps the ending zero byte of the text
+        self.data = data + chr(0)
+
+    def __str__(self):
+        return self.data
+
+class Item(object):
+    """ What layers, channels and vectors share: ID, tattoo, name, parasites """
+    def __init__(self, image, name):
+        self.ID = new_id()
+        self.tattoo = self.ID
+        self.image = image
+        self._name = name
+        self._visible = True
+        self._parent = None
+        self.parasites = {}
+
+    def _get_name(self):
+        wire('gimp_item_get_name')
+        return self._name
+
+    def _set_name(self, name):
+        wire('gimp_item_set_name')
+        self._name = name
+
+    name = property(_get_name, _set_name)
+
+    def _get_visible(self):
+        wire('gimp_item_get_visible')
+        return self._visible
+
+    def _set_visible(self, visible):
+        wire('gimp_item_set_visible')
+        self._visible = bool(visible)
+
+    visible = property(_get_visible, _set_visible)
+
+    @property
+    def parent(self):
+        wire('gimp_item_get_parent')
+        return self._parent
+
+    @property
+    def children(self):
+        wire('gimp_item_get_children')
+        return []
+
+    def parasite_find(self, name):
+        wire('gimp_item_get_parasite')
+        return self.parasites.get(name)
+
+    def parasite_list(self):
+        wire('gimp_item_get_parasite_list')
+        return tuple(sorted(self.parasites))
+
+    def attach_new_parasite(self, name, flags, data):
+        wire('gimp_item_attach_parasite')
+        self.parasites[name] = Parasite(name, flags, data)
+
+# bytes by pixel of the drawable types
+type_bpp = (3, 4, 1, 2, 1, 2)
+tile_side = 64
+
+class PixelRegion(object):
+    """
+    'region[x1:x2, y1:y2]' reads or writes the bytes of a rectangle, here
+    within one tile of the drawable; a tile never written is of 'file_block'.
+    """
+    def __init__(self, drawable):
+        self.drawable = drawable
+
+    def _pixels(self, tile, size):
+        # a tile never written: 'file_block' from a place of the drawable and tile
+        start = (self.drawable.ID*7 + tile[0]*3 + tile[1]*5)%len(file_block)
+        data = file_block[start:] + file_block*(size//len(file_block) + 1)
+        return data[:size]
+
+    def _tile(self, key):
+        xs, ys = key
+        tile = (xs.start//tile_side, ys.start//tile_side)
+        if (xs.stop - 1)//tile_side != tile[0] or (ys.stop - 1)//tile_side != tile[1] :
+            raise ValueError("the stand-in reads and writes within a tile")
+        return tile, (xs.stop - xs.start)*(ys.stop - ys.start)*self.drawable._bpp
+
+    def __getitem__(self, key):
+        wire('gimp_pixel_rgn_get_rect')
+        tile, size = self._tile(key)
+        data = self.drawable._tiles.get(tile)
+        if data is None : data = self._pixels(tile, size)
+        return data
+
+    def __setitem__(self, key, data):
+        wire('gimp_pixel_rgn_set_rect')
+        tile, size = self._tile(key)
+        if len(data) != size : raise ValueError("rectangle and data sizes")
+        self.drawable._tiles[tile] = data
+
+class Drawable(Item):
+    """ Size, and pixels by tiles for the pixel regions """
+    def __init__(self, image, name, width, height, bpp):
+        Item.__init__(self, image, name)
+        self._width = width
+        self._height = height
+        self._bpp = bpp
+        # (column, row): bytes of the tiles written
+        self._tiles = {}
+
+    @property
+    def width(self):
+        wire('gimp_drawable_width')
+        return self._width
+
+    @property
+    def height(self):
+        wire('gimp_drawable_height')
+        return self._height
+
+    @property
+    def bpp(self):
+        wire('gimp_drawable_bpp')
+        return self._bpp
+
+    def get_pixel_rgn(self, x, y, width, height, dirty=True, shadow=False):
+        return PixelRegion(self)
+
+    def flush(self):
+        pass
+
+    def update(self, x, y, width, height):
+        wire('gimp_drawable_update')
+
+class Layer(Drawable):
+    def __init__(self, image, name, width, height, type=1, opacity=100, mode=0):
+        Drawable.__init__(self, image, name, width, height, type_bpp[type])
+        self._type = type
+        self._offsets = (0, 0)
+        self._mask = None
+        self.opacity = opacity
+        self.mode = mode
+
+    @property
+    def mask(self):
+        wire('gimp_layer_get_mask')
+        return self._mask
+
+    def create_mask(self, mask_type):
+        wire('gimp_layer_create_mask')
+        return Channel(self.image, self._name, self._width, self._height)
+
+    def add_mask(self, mask):
+        wire('gimp_layer_add_mask')
+        self._mask = mask
+
+    @property
+    def type(self):
+        wire('gimp_drawable_type')
+        return self._type
+
+    @property
+    def offsets(self):
+        wire('gimp_drawable_offsets')
+        return self._offsets
+
+    def set_offsets(self, x, y):
+        wire('gimp_layer_set_offsets')
+        self._offsets = (x, y)
+
+    def fill(self, fill_type):
+        wire('gimp_drawable_fill')
+
+    def resize(self, width, height, off_x=0, off_y=0):
+        wire('gimp_layer_resize')
+        self._width, self._height = width, height
+
+class GroupLayer(Layer):
+    def __init__(self, image, name="Group", width=1, height=1, type=1,\
+                 opacity=100, mode=0):
+        Layer.__init__(self, image, name, width, height, type, opacity, mode)
+        self._children = []
+
+    @property
+    def layers(self):
+        wire('gimp_item_get_children')
+        return list(self._children)
+
+    @property
+    def children(self):
+        wire('gimp_item_get_children')
+        return list(self._children)
+
+class Channel(Drawable):
+    def __init__(self, image, name, width, height, opacity=50, color=(0, 0, 0)):
+        Drawable.__init__(self, image, name, width, height, 1)
+        self._opacity = opacity
+        self._color = tuple(color)
+
+    @property
+    def opacity(self):
+        wire('gimp_channel_get_opacity')
+        return self._opacity
+
+    @property
+    def color(self):
+        wire('gimp_channel_get_color')
+        return self._color
+
+class Stroke(object):
+    def __init__(self, vectors, coords, closed=False):
+        self.vectors = vectors
+        self.ID = new_id()
+        self._points = (list(coords), closed)
+
+    @property
+    def points(self):
+        wire('gimp_vectors_stroke_get_points')
+        return (list(self._points[0]), self._points[1])
+
+    def set_points(self, coords, closed=False):
+        # for the benchmark, the user moving anchors
+        self._points = (list(coords), closed)
+
+class Display(object):
+    def __init__(self, image):
+        wire('gimp_display_new')
+        self.image = image
+
+class Vectors(Item):
+    def __init__(self, image, name):
+        Item.__init__(self, image, name)
+        self._strokes = []
+
+    @property
+    def strokes(self):
+        wire('gimp_vectors_get_strokes')
+        return list(self._strokes)
+
+    def add_stroke(self, coords, closed=False):
+        stroke = Stroke(self, coords, closed)
+        self._strokes.append(stroke)
+        return stroke
+
+class Image(object):
+    def __init__(self, width, height, type=0, name=None, filename=None):
+        self.ID = new_id()
+        self._width = width
+        self._height = height
+        self.base_type = type
+        self._name = name or "Untitled"
+        self._filename = filename
+        self._layers = []
+        self._vectors = []
+        self._channels = []
+        self.dirty = False
+        self.active_layer = None
+        self.undo_enabled = True
+        self.undo_groups = 0
+        # strokes painted, for the thumbnail
+        self._strokes = 0
+        self._colormap = ()
+        self._resolution = (72.0, 72.0)
+        # (orientation, position) by guide ID
+        self._guides = {}
+        self.parasites = {}
+        images.append(self)
+
+    @property
+    def width(self):
+        wire('gimp_image_width')
+        return self._width
+
+    @property
+    def height(self):
+        wire('gimp_image_height')
+        return self._height
+
+    @property
+    def name(self):
+        wire('gimp_image_get_name')
+        return self._name
+
+    @property
+    def filename(self):
+        wire('gimp_image_get_filename')
+        return self._filename
+
+    @property
+    def layers(self):
+        wire('gimp_image_get_layers')
+        return list(self._layers)
+
+    @property
+    def vectors(self):
+        wire('gimp_image_get_vectors')
+        return list(self._vectors)
+
+    @property
+    def channels(self):
+        wire('gimp_image_get_channels')
+        return list(self._channels)
+
+    @property
+    def active_drawable(self):
+        wire('gimp_image_get_active_drawable')
+        return self.active_layer
+
+    parasite_find = Item.__dict__['parasite_find']
+    parasite_list = Item.__dict__['parasite_list']
+    attach_new_parasite = Item.__dict__['attach_new_parasite']
+
+    def add_channel(self, channel, position=-1):
+        wire('gimp_image_add_channel')
+        self._channels.insert(max(0, position), channel)
+        channel.image = self
+
+    def add_layer(self, layer, position=-1):
+        wire('gimp_image_add_layer')
+        self.insert_layer(layer, None, max(0, position))
+
+    def insert_layer(self, layer, parent=None, position=0):
+        # without wire count, also used to build the test images
+        siblings = self._layers
+        if parent != None : siblings = parent._children
+        siblings.insert(position, layer)
+        layer._parent = parent
+        layer.image = self
+        if self.active_layer == None : self.active_layer = layer
+        self.dirty = True
+
+    def remove_layer(self, layer):
+        wire('gimp_image_remove_layer')
+        siblings = self._layers
+        if layer._parent != None : siblings = layer._parent._children
+        siblings.remove(layer)
+        if self.active_layer is layer :
+            self.active_layer = self._layers and self._layers[0] or None
+
+    def raise_layer_to_top(self, layer):
+        wire('gimp_image_raise_layer_to_top')
+        self._layers.remove(layer)
+        self._layers.insert(0, layer)
+
+    def merge_down(self, layer, merge_type):
+        wire('gimp_image_merge_down')
+        index = self._layers.index(layer)
+        below = self._layers[index + 1]
+        self._layers.remove(layer)
+        return below
+
+    def all_layers(self):
+        # depth first, without wire count
+        stack = list(reversed(self._layers))
+        found = []
+        while stack :
+            layer = stack.pop()
+            found.append(layer)
+            if isinstance(layer, GroupLayer) : stack.extend(reversed(layer._children))
+        return found
+
+    def paint(self):
+        """ A stroke on a tile of the active layer, the image is dirty """
+        self._strokes += 1
+        layer = self.active_layer
+        tile = (self._strokes%(layer._width//tile_side + 1), 0)
+        w = min(tile_side, layer._width - tile[0]*tile_side)
+        h = min(tile_side, layer._height)
+        layer._tiles[tile] = chr(self._strokes%251)*(w*h*layer._bpp)
+        self.dirty = True
+
+    def clean_all(self):
+        wire('gimp_image_clean_all')
+        self.dirty = False
+
+    def disable_undo(self):
+        wire('gimp_image_undo_disable')
+        self.undo_enabled = False
+
+    def enable_undo(self):
+        wire('gimp_image_undo_enable')
+        self.undo_enabled = True
+
+    def undo_group_start(self):
+        wire('gimp_image_undo_group_start')
+        self.undo_groups += 1
+
+    def undo_group_end(self):
+        wire('gimp_image_undo_group_end')
+        self.undo_groups -= 1
+
+### PDB ########################################################################
+
+def find_item(item_id):
+    # an item from its ID, as the PDB gets it
+    for image in images :
+        for item in image.all_layers() + image._vectors + image._channels :
+            if item.ID == item_id : return item
+    return None
+
+brushes = {'2. Hardness 050': 10.0}
+context = {'brush': '2. Hardness 050'}
+
+def _brush_new(name):
+    unique = name
+    nr = 1
+    while unique in brushes :
+        nr += 1
+        unique = "%s #%d"%(name, nr)
+    brushes[unique] = 5.0
+    return unique
+
+def _brush_set_radius(name, radius):
+    brushes[name] = radius
+
+def _context_set_brush(name):
+    context['brush'] = name
+
+def _parasite_list(item):
+    names = tuple(sorted(item.parasites))
+    return len(names), names
+
+def _image_get_layers(image):
+    ids = tuple(layer.ID for layer in image._layers)
+    return len(ids), ids
+
+def _item_get_children(item):
+    ids = tuple(child.ID for child in getattr(item, '_children', ()))
+    return len(ids), ids
+
+def _set_visible(item, visible):
+    item._visible = bool(visible)
+
+def _file_save(image, drawable, filename, raw_filename):
+    # a file of the size of the layer pixels, compressed as GIMP does
+    size = sum([L._width*L._height*L._bpp for L in image.all_layers()])
+    if filename.endswith('.bz2') : f = bz2.BZ2File(filename, 'wb')
+    elif filename.endswith('.gz') : f = gzip.open(filename, 'wb')
+    else : f = open(filename, 'wb')
+    f.write(b'gimp xcf file\0' + (file_block*(size//len(file_block) + 1))[:size])
+    f.close()
+    # a save through the PDB leaves the image dirty
+
+def _file_load(filename, raw_filename):
+    if not os.path.isfile(filename) : raise RuntimeError("Could not open '%s'"%filename)
+    image = Image(640, 480, 0, os.path.basename(filename), filename)
+    group = None
+    for i in range(file_layers) :
+        if not i%10 :
+            group = GroupLayer(image, "Group %d"%(i//10))
+            image.insert_layer(group, None, len(image._layers))
+        else :
+            layer = Layer(image, "Layer %d"%i, 640, 480)
+            image.insert_layer(layer, group, len(group._children))
+    image.dirty = False
+    return image
+
+def _drawable_thumbnail(drawable, width, height):
+    # the bytes of the drawable scaled to fit, RGB(A) or gray (channels); the
+    # same bytes for the same written tiles
+    scale = min(1.0, float(width)/drawable._width, float(height)/drawable._height)
+    w, h = max(1, int(drawable._width*scale)), max(1, int(drawable._height*scale))
+    bpp = (3, 4, 1, 2, 3, 4)[getattr(drawable, '_type', 2)]
+    seed = b'%08x'%(hash(tuple(sorted(drawable._tiles.items()))) & 0xffffffff)
+    return w, h, bpp, w*h*bpp, (seed*(w*h*bpp//8 + 1))[:w*h*bpp]
+
+def _image_thumbnail(image, width, height):
+    # pixels of the strokes
+    data = (b'%d,'%image._strokes)*(width*height)
+    return width, height, 3, len(data[:width*height*3]), data[:width*height*3]
+
+def _tattoo_state(image):
+    return max([item.tattoo for item in image.all_layers() + image._channels] or [0])
+
+def _layer_group_new(image):
+    return GroupLayer(image)
+
+def _set_colormap(image, num_bytes, colormap):
+    image._colormap = tuple(colormap)
+
+def _image_delete(image):
+    if image in images : images.remove(image)
+
+def _vectors_new(image, name):
+    return Vectors(image, name)
+
+def _image_add_vectors(image, vectors, position):
+    image._vectors.insert(max(0, position), vectors)
+
+def _image_remove_vectors(image, vectors):
+    image._vectors.remove(vectors)
+
+def _set_resolution(image, x, y):
+    image._resolution = (x, y)
+
+def _add_guide(orientation):
+    def add(image, position):
+        guide = new_id()
+        image._guides[guide] = (orientation, position)
+        return guide
+    return add
+
+def _find_next_guide(image, guide):
+    # 0 after the last one
+    following = [g for g in sorted(image._guides) if g > guide]
+    return following and following[0] or 0
+
+def _vectors_export(image, vectors):
+    # the names, for the SVG
+    return '\n'.join([v._name for v in image._vectors])
+
+def _vectors_import(image, svg, length, merge, scale):
+    added = [Vectors(image, name) for name in svg.split('\n')]
+    image._vectors[:0] = added
+    return len(added), [v.ID for v in added]
+
+def _layer_resize(layer, width, height, off_x, off_y):
+    layer._width, layer._height = width, height
+
+procedures = {
+    'gimp_brush_new': _brush_new,
+    'gimp_brush_get_radius': lambda name: brushes[name],
+    'gimp_brush_set_radius': _brush_set_radius,
+    'gimp_brush_delete': lambda name: brushes.pop(name, None),
+    'gimp_context_get_brush': lambda: context['brush'],
+    'gimp_context_set_brush': _context_set_brush,
+    'gimp_drawable_get_name': lambda item: item._name,
+    'gimp_item_get_name': lambda item: item._name,
+    'gimp_drawable_is_text_layer': lambda item: False,
+    'gimp_item_is_group': lambda item: isinstance(item, GroupLayer),
+    'gimp_item_get_parasite_list': _parasite_list,
+    'gimp_drawable_parasite_list': _parasite_list,
+    'gimp_item_get_visible': lambda item: item._visible,
+    'gimp_item_set_visible': _set_visible,
+    'gimp_drawable_set_visible': _set_visible,
+    'gimp_image_get_layers': _image_get_layers,
+    'gimp_item_get_children': _item_get_children,
+    'gimp_drawable_thumbnail': _drawable_thumbnail,
+    'gimp_image_thumbnail': _image_thumbnail,
+    'gimp_image_get_tattoo_state': _tattoo_state,
+    'gimp_layer_group_new': _layer_group_new,
+    'gimp_image_get_colormap': lambda image: (len(image._colormap), image._colormap),
+    'gimp_image_set_colormap': _set_colormap,
+    'gimp_image_delete': _image_delete,
+    'gimp_file_save': _file_save,
+    'gimp_file_load': _file_load,
+    'gimp_vectors_new': _vectors_new,
+    'gimp_image_add_vectors': _image_add_vectors,
+    'gimp_image_remove_vectors': _image_remove_vectors,
+    'gimp_layer_resize': _layer_resize,
+    'gimp_image_get_resolution': lambda image: image._resolution,
+    'gimp_image_set_resolution': _set_resolution,
+    'gimp_image_add_hguide': _add_guide(0),
+    'gimp_image_add_vguide': _add_guide(1),
+    'gimp_image_find_next_guide': _find_next_guide,
+    'gimp_image_get_guide_orientation': lambda image, guide: image._guides[guide][0],
+    'gimp_image_get_guide_position': lambda image, guide: image._guides[guide][1],
+    'gimp_vectors_export_to_string': _vectors_export,
+    'gimp_vectors_import_from_string': _vectors_import,
+}
+
+class PDB(object):
+    """ 'pdb.name(...)' calls the model of 'procedures' through the wire """
+    def __getattr__(self, name):
+        if name.startswith('__') : raise AttributeError(name)
+        model = procedures.get(name)
+        def procedure(*args) :
+            wire(name)
+            if model : return model(*args)
+        procedure.__name__ = name
+        return procedure
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+pdb = PDB()
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+"""
+ Stand-in of 'gimpfu' for the benchmarks: the 'gimp' model, its 'pdb', the
+ enums used by the plug-ins and a 'register()' keeping the procedures in
+ 'procedures' instead of telling GIMP. 'main()' does nothing.
+"""
+
+import gimp
+from gimp import pdb
+
+# procedure name: the plug-in function
+procedures = {}
+
+def register(proc_name, blurb, help, author, copyright, date, label, imagetypes,\
+             params, results, function, menu=None, domain=None, on_query=None,\
+             on_run=None):
+    procedures[proc_name] = function
+
+def main():
+    pass
+
+# channel operations
+CHANNEL_OP_ADD, CHANNEL_OP_SUBTRACT, CHANNEL_OP_REPLACE, CHANNEL_OP_INTERSECT\
+    = range(4)
+# fill types
+FOREGROUND_FILL, BACKGROUND_FILL, WHITE_FILL, TRANSPARENT_FILL, PATTERN_FILL\
+    = range(5)
+# image types
+RGB, GRAY, INDEXED = range(3)
+RGB_IMAGE, RGBA_IMAGE, GRAY_IMAGE, GRAYA_IMAGE, INDEXED_IMAGE, INDEXEDA_IMAGE\
+    = range(6)
+NORMAL_MODE = 0
+ADD_WHITE_MASK, ADD_BLACK_MASK, ADD_ALPHA_MASK = range(3)
+ORIENTATION_HORIZONTAL, ORIENTATION_VERTICAL = range(2)
+EXPAND_AS_NECESSARY, CLIP_TO_IMAGE, CLIP_TO_BOTTOM_LAYER, FLATTEN_IMAGE = range(4)
+RUN_INTERACTIVE, RUN_NONINTERACTIVE, RUN_WITH_LAST_VALS = range(3)
+
+# parameter types of 'register()'
+PF_INT32, PF_INT16, PF_INT8, PF_STRING, PF_FLOAT, PF_COLOR, PF_IMAGE, PF_LAYER,\
+PF_CHANNEL, PF_DRAWABLE, PF_VECTORS, PF_TOGGLE, PF_SLIDER, PF_SPINNER, PF_FONT,\
+PF_FILE, PF_DIRNAME, PF_OPTION, PF_RADIO, PF_TEXT = range(20)
+PF_INT = PF_INT32
+PF_BOOL = PF_TOGGLE
+PF_FILENAME = PF_FILE
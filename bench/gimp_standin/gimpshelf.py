@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+
+""" Stand-in of 'gimpshelf': the shelf lives as long as the Python process """
+
+class Shelf(dict):
+    def has_key(self, key):
+        return key in self
+
+shelf = Shelf()
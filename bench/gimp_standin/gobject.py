@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+"""
+ Stand-in of 'gobject' timeouts for the benchmarks: they are only recorded in
+ 'sources', 'run_sources()' calls each pending one once (as a main loop
+ iteration would) and drops those returning False.
+"""
+
+sources = {}
+last_id = [0]
+
+def timeout_add(interval, callback, *args, **kwargs):
+    last_id[0] += 1
+    sources[last_id[0]] = (callback, args)
+    return last_id[0]
+
+def timeout_add_seconds(interval, callback, *args, **kwargs):
+    return timeout_add(interval*1000, callback, *args)
+
+idle_add = timeout_add
+
+def threads_init():
+    pass
+
+def source_remove(source_id):
+    return sources.pop(source_id, None) != None
+
+def run_sources():
+    for source_id, (callback, args) in list(sources.items()) :
+        if source_id in sources and not callback(*args) :
+            sources.pop(source_id, None)
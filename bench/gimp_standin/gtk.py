@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+
+"""
+ Stand-in of PyGTK 2 for the benchmarks: widgets keep their text, value and
+ active index and emit their 'changed' or 'value_changed' signals, the rest
+ of the calls do nothing. 'main()' returns at once, the benchmark calls the
+ plug-in callbacks itself. Dialogs answer 'dialog_response' and the file
+ choosers give 'chosen_filename' and 'current_folder'.
+"""
+
+import sys, tempfile, imp
+
+# as the gtk module does on import, the plug-ins mix unicode and utf-8 texts
+reload(sys)
+sys.setdefaultencoding('utf-8')
+
+dialog_response = -5            # RESPONSE_OK
+chosen_filename = None
+current_folder = tempfile.gettempdir()
+# number of 'main_quit()' calls
+quits = [0]
+
+def main():
+    pass
+
+def main_quit(*args):
+    quits[0] += 1
+
+def _noop(self, *args, **kwargs):
+    pass
+
+class Widget(object):
+    def __init__(self, *args, **kwargs):
+        self._handlers = {}
+        self._text = ''
+        if args and isinstance(args[0], basestring) : self._text = args[0]
+        if 'label' in kwargs : self._text = kwargs['label']
+
+    def connect(self, signal, handler, *data):
+        self._handlers.setdefault(signal, []).append((handler, data))
+        return len(self._handlers[signal])
+
+    def emit(self, signal):
+        for handler, data in self._handlers.get(signal, []) :
+            handler(self, *data)
+
+    def set_text(self, text):
+        self._text = text
+
+    def get_text(self):
+        return self._text
+
+    set_label = set_text
+    get_label = get_text
+
+for _name in ('add', 'attach', 'pack_start', 'pack_end', 'show', 'show_all', 'hide',\
+        'destroy', 'set_title', 'set_border_width', 'set_keep_above',\
+        'set_has_tooltip', 'set_tooltip_text', 'set_alignment', 'set_attributes',\
+        'set_col_spacings', 'set_row_spacings', 'set_digits', 'set_wrap_width',\
+        'set_from_stock', 'set_use_markup', 'set_markup', 'set_current_name',\
+        'set_extra_widget', 'set_icon_from_file', 'set_increments', 'set_numeric',\
+        'set_range', 'set_show_hidden', 'set_shadow_type', 'set_label_widget',\
+        'set_size_request', 'set_sensitive', 'set_urgency_hint', 'set_focus_on_map',\
+        'set_position', 'set_editable', 'set_max_length', 'set_width_chars',\
+        'set_do_overwrite_confirmation', 'set_select_multiple', 'add_filter',\
+        'set_default_size', 'set_resizable', 'set_modal', 'set_transient_for',\
+        'grab_focus', 'queue_draw', 'present', 'set_from_pixbuf', 'clear',\
+        'set_policy', 'set_fixed_height_mode', 'set_enable_search', 'set_sizing',\
+        'set_fixed_width', 'set_mode', 'append_column', 'set_headers_visible',\
+        'set_label_align'):
+    setattr(Widget, _name, _noop)
+
+class Window(Widget):
+    pass
+
+class VBox(Widget):
+    pass
+
+class HBox(Widget):
+    pass
+
+class Table(Widget):
+    pass
+
+class Frame(Widget):
+    pass
+
+class HSeparator(Widget):
+    pass
+
+class VSeparator(Widget):
+    pass
+
+class Image(Widget):
+    pass
+
+class ScrolledWindow(Widget):
+    pass
+
+class Label(Widget):
+    pass
+
+class Entry(Widget):
+    def set_text(self, text):
+        changed = text != self._text
+        self._text = text
+        if changed : self.emit('changed')
+
+class Button(Widget):
+    def clicked(self):
+        self.emit('pressed')
+        self.emit('clicked')
+
+class ToggleButton(Button):
+    def __init__(self, *args, **kwargs):
+        Button.__init__(self, *args, **kwargs)
+        self._active = False
+
+    def set_active(self, active):
+        changed = bool(active) != self._active
+        self._active = bool(active)
+        if changed : self.emit('toggled')
+
+    def get_active(self):
+        return self._active
+
+class CheckButton(ToggleButton):
+    pass
+
+class Adjustment(object):
+    def __init__(self, value=0, lower=0, upper=0, step_incr=0, page_incr=0,\
+                 page_size=0):
+        self.value = value
+        self.lower = lower
+        self.upper = upper
+        self._handlers = {}
+
+    connect = Widget.__dict__['connect']
+    emit = Widget.__dict__['emit']
+
+    def set_value(self, value):
+        changed = value != self.value
+        self.value = value
+        if changed : self.emit('value_changed')
+
+    def get_value(self):
+        return self.value
+
+    def set_lower(self, lower):
+        self.lower = lower
+
+    def set_upper(self, upper):
+        self.upper = upper
+
+    def changed(self):
+        self.emit('changed')
+
+class HScale(Widget):
+    def __init__(self, adjustment=None):
+        Widget.__init__(self)
+        self.adjustment = adjustment
+
+class SpinButton(Widget):
+    def __init__(self, adjustment=None, climb_rate=0.0, digits=0):
+        Widget.__init__(self)
+        self.adjustment = adjustment or Adjustment()
+
+    def set_value(self, value):
+        self.adjustment.set_value(value)
+        self.emit('value-changed')
+
+    def get_value(self):
+        return self.adjustment.value
+
+    def get_value_as_int(self):
+        return int(self.adjustment.value)
+
+class ComboBox(Widget):
+    def __init__(self, *args, **kwargs):
+        Widget.__init__(self)
+        self._items = []
+        self._active = -1
+
+    def append_text(self, text):
+        self._items.append(text)
+
+    def remove_text(self, position):
+        del self._items[position]
+
+    def get_active_text(self):
+        if self._active < 0 : return None
+        return self._items[self._active]
+
+    def set_active(self, index):
+        changed = index != self._active
+        self._active = index
+        if changed : self.emit('changed')
+
+    def get_active(self):
+        return self._active
+
+    def get_model(self):
+        return self._items
+
+class Pixbuf(object):
+    def __init__(self, data, colorspace, has_alpha, bits_per_sample, width, height,\
+                 rowstride):
+        if len(data) != rowstride*height : raise ValueError("data length")
+        self.data = data
+        self.width, self.height = width, height
+        self.has_alpha = has_alpha
+
+# 'gtk.gdk', only the pixbufs
+gdk = imp.new_module('gtk.gdk')
+gdk.COLORSPACE_RGB = 0
+gdk.Pixbuf = Pixbuf
+gdk.pixbuf_new_from_data = Pixbuf
+
+def combo_box_new_text():
+    return ComboBox()
+
+class GenericTreeModel(object):
+    """ The plug-in model gives the rows by its 'on_*' methods """
+    def __init__(self):
+        pass
+
+    def __len__(self):
+        return self.on_iter_n_children(None)
+
+class TreeSelection(Widget):
+    def __init__(self, view):
+        Widget.__init__(self)
+        self.view = view
+        self._path = None
+
+    def select_path(self, path):
+        changed = path != self._path
+        self._path = tuple(path)
+        if changed : self.emit('changed')
+
+    def unselect_all(self):
+        changed = self._path is not None
+        self._path = None
+        if changed : self.emit('changed')
+
+    def get_selected_rows(self):
+        if self._path is None : return self.view._model, []
+        return self.view._model, [self._path]
+
+class TreeView(Widget):
+    """
+    Only the rows in sight are asked to the model, as GTK does with a fixed
+    height mode: 'rows_shown' from the top, or around the row scrolled to.
+    """
+    rows_shown = 25
+
+    def __init__(self, model=None):
+        Widget.__init__(self)
+        self._model = None
+        self._selection = TreeSelection(self)
+        if model is not None : self.set_model(model)
+
+    def _show(self, top):
+        count = len(self._model)
+        for row in range(max(0, top), min(count, top + self.rows_shown)) :
+            for column in range(self._model.on_get_n_columns()) :
+                self._model.on_get_value(row, column)
+
+    def set_model(self, model):
+        self._selection.unselect_all()
+        self._model = model
+        self._show(0)
+
+    def get_model(self):
+        return self._model
+
+    def get_selection(self):
+        return self._selection
+
+    def scroll_to_cell(self, path, column=None, use_align=False, row_align=0.0,\
+                       col_align=0.0):
+        self._show(path[0] - self.rows_shown//2)
+
+class TreeViewColumn(Widget):
+    pass
+
+class CellRendererText(Widget):
+    pass
+
+class Dialog(Widget):
+    def __init__(self, *args, **kwargs):
+        Widget.__init__(self, *args, **kwargs)
+        self.vbox = VBox()
+        self.action_area = HBox()
+
+    def run(self):
+        return dialog_response
+
+class MessageDialog(Dialog):
+    pass
+
+class FileChooserDialog(Dialog):
+    def __init__(self, title=None, parent=None, action=0, buttons=None,\
+                 backend=None):
+        Dialog.__init__(self)
+        self._folder = current_folder
+
+    def get_filename(self):
+        return chosen_filename
+
+    def get_current_folder(self):
+        return self._folder
+
+    def set_current_folder(self, folder):
+        self._folder = folder
+        return True
+
+class FileChooser(FileChooserDialog):
+    pass
+
+class FileChooserButton(FileChooserDialog):
+    pass
+
+class FileFilter(Widget):
+    add_pattern = _noop
+    set_name = _noop
+
+FILL, EXPAND, SHRINK = 4, 1, 2
+TREE_MODEL_ITERS_PERSIST, TREE_MODEL_LIST_ONLY = 1, 2
+TREE_VIEW_COLUMN_GROW_ONLY, TREE_VIEW_COLUMN_AUTOSIZE, TREE_VIEW_COLUMN_FIXED = range(3)
+SELECTION_NONE, SELECTION_SINGLE, SELECTION_BROWSE, SELECTION_MULTIPLE = range(4)
+RESPONSE_NONE, RESPONSE_REJECT, RESPONSE_ACCEPT, RESPONSE_DELETE_EVENT,\
+RESPONSE_OK, RESPONSE_CANCEL, RESPONSE_CLOSE, RESPONSE_YES, RESPONSE_NO,\
+RESPONSE_APPLY, RESPONSE_HELP = range(-1, -12, -1)
+DIALOG_MODAL, DIALOG_DESTROY_WITH_PARENT = 1, 2
+MESSAGE_INFO, MESSAGE_WARNING, MESSAGE_QUESTION, MESSAGE_ERROR = range(4)
+BUTTONS_NONE, BUTTONS_OK, BUTTONS_CLOSE, BUTTONS_CANCEL, BUTTONS_YES_NO,\
+BUTTONS_OK_CANCEL = range(6)
+FILE_CHOOSER_ACTION_OPEN, FILE_CHOOSER_ACTION_SAVE,\
+FILE_CHOOSER_ACTION_SELECT_FOLDER, FILE_CHOOSER_ACTION_CREATE_FOLDER = range(4)
+ICON_SIZE_MENU, ICON_SIZE_SMALL_TOOLBAR, ICON_SIZE_LARGE_TOOLBAR,\
+ICON_SIZE_BUTTON = range(1, 5)
+SHADOW_NONE, SHADOW_IN, SHADOW_OUT, SHADOW_ETCHED_IN, SHADOW_ETCHED_OUT = range(5)
+POLICY_ALWAYS, POLICY_AUTOMATIC, POLICY_NEVER = range(3)
+STOCK_CANCEL = 'gtk-cancel'
+STOCK_EDIT = 'gtk-edit'
+STOCK_EXECUTE = 'gtk-execute'
+STOCK_GO_BACK = 'gtk-go-back'
+STOCK_SAVE = 'gtk-save'
+STOCK_STOP = 'gtk-stop'
+STOCK_OPEN = 'gtk-open'
+STOCK_OK = 'gtk-ok'
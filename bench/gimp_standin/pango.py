@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+
+""" Stand-in of 'pango' for the benchmarks, the attributes are only kept """
+
+WEIGHT_NORMAL, WEIGHT_BOLD, WEIGHT_ULTRABOLD = 400, 700, 800
+
+class AttrList(list):
+    def insert(self, attribute):
+        self.append(attribute)
+
+def _attribute(*args):
+    return args
+
+AttrForeground = AttrBackground = AttrSize = AttrWeight = _attribute
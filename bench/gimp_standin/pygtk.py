@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+""" Stand-in of 'pygtk' for the benchmarks """
+
+def require(version):
+    pass
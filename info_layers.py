@@ -25,7 +25,10 @@
 """
 
 import gtk, pango
-import os, sys, gettext
+import os, sys, gettext, csv, json, glob, time, subprocess, fnmatch, bisect
+from xml.sax.saxutils import escape, quoteattr
+from array import array
+from distutils.spawn import find_executable
 
 try:
     from gimpfu import *
@@ -33,6 +36,13 @@ try:
 except ImportError:
     print("Note: GIMP is needed, '%s' is a plug-in for it.\n"%__file__)
     sys.exit(1)
+# layer traversal, in the same folder as this plug-in
+from layer_walk import walk_tree, walk_layers, group_type
+try:
+    import sqlite3
+except ImportError:
+    # no sidecar index, the layers are always read from GIMP
+    sqlite3 = None
 
 ### global variables ###########################################################
 
@@ -44,18 +54,442 @@ gettext.install( "info_layers", locale_directory, unicode=True )
 
 enum_type = [_('RGB'), _('RGBA'), _('GRAY'), _('GRAYA'), _('INDEXED'), _('INDEXEDA')]
 prob = _("ERROR: the layer object list isn't the same!\n  Plug-in has auto quitted.")
-# store the initial layer visibility state to restore it
-layer_view = []
-layers = []
-
 version = gimp.version
 start_minver = 6 # minor version of the previous GIMP-2.6
+# sidecar index of the layers of the saved files, see 'LayerStore'
+store_file = os.path.join(os.path.dirname(os.path.abspath(fi)), 'info_layers',\
+    'layers.sqlite')
+store = None
+# box side of the preview thumbnails and how many are kept, see 'ThumbnailCache'
+preview_size = 128
+preview_kept = 64
+
+### Layer index ################################################################
+
+class LayerIndex():
+    """
+    The layers of 'img' from the top, depth-first, in flat lists: 'items[i]',
+    'ids[i]', 'parent[i]' the position of its group (-1 at top level) and 'end[i]'
+    the position after its subtree. 'validate()' checks it with one PDB call for
+    the image and one by group (or only the groups on the path of a layer), and
+    reads again only the changed levels; 'generation' counts the changes.
+    """
+    def __init__(self, img):
+        self.img = img
+        self.generation = 0
+        # container ID (0 for the image): its child IDs, and ID: layer
+        self.kids = {0: []}
+        self.objects = {}
+        for L, depth, parent in walk_layers(img) :
+            self.objects[L.ID] = L
+            if parent is None : self.kids[0].append(L.ID)
+            else : self.kids[parent.ID].append(L.ID)
+            if isinstance(L, group_type) : self.kids[L.ID] = []
+        for key in self.kids : self.kids[key] = tuple(self.kids[key])
+        self.flatten()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def read(self, key):
+        """ Children of the container 'key' from GIMP, returns their group IDs """
+        if key : children = self.objects[key].layers
+        else : children = self.img.layers
+        self.kids[key] = tuple([L.ID for L in children])
+        groups = []
+        for L in children :
+            self.objects[L.ID] = L
+            if isinstance(L, group_type) : groups.append(L.ID)
+        return groups
+
+    def child_ids(self, key):
+        # the IDs only, no layer object to build
+        if key : n, ids = pdb.gimp_item_get_children(self.objects[key])
+        else : n, ids = pdb.gimp_image_get_layers(self.img)
+        return tuple(ids)
+
+    def validate(self, pos=None):
+        """
+        True if the index is still the image layers, else it is patched; with
+        'pos', only the top level and the groups from the layer at 'pos' up
+        """
+        path = None
+        if pos is not None and 0 <= pos < len(self.ids) :
+            path = set([0])
+            while pos >= 0 :
+                path.add(self.ids[pos])
+                pos = self.parent[pos]
+        changed = False
+        stack = [0]
+        while stack :
+            key = stack.pop()
+            if key not in self.kids :
+                # a new group
+                stack.extend(self.read(key))
+                changed = True
+                continue
+            ids = self.child_ids(key)
+            if ids != self.kids[key] :
+                # the new groups are read whatever the path
+                groups = self.read(key)
+                stack.extend([i for i in groups\
+                    if path is None or i in path or i not in self.kids])
+                changed = True
+            else : stack.extend([i for i in ids\
+                if i in self.kids and (path is None or i in path)])
+        if changed :
+            self.flatten()
+            self.generation += 1
+        return not changed
+
+    def walk(self, breadth_first=False):
+        """ As 'walk_layers()' on the image, from the index without PDB call """
+        objects, kids = self.objects, self.kids
+        return walk_tree([objects[i] for i in kids[0]],\
+            lambda L : [objects[i] for i in kids.get(L.ID, ())], breadth_first)
+
+    def flatten(self):
+        self.items, self.ids, self.parent = [], [], []
+        kids, objects = {0: self.kids[0]}, {}
+        # the ID: position of the groups
+        position = {}
+        for ID, depth, up in walk_tree(self.kids[0], self.kids.get) :
+            objects[ID] = self.objects[ID]
+            self.parent.append(position.get(up, -1))
+            self.ids.append(ID)
+            self.items.append(objects[ID])
+            if ID in self.kids :
+                kids[ID] = self.kids[ID]
+                position[ID] = len(self.ids) - 1
+        # forget the removed layers and groups
+        self.kids, self.objects = kids, objects
+        self.end = [i + 1 for i in range(len(self.ids))]
+        for i in range(len(self.ids) - 1, -1, -1) :
+            up = self.parent[i]
+            if up >= 0 and self.end[i] > self.end[up] : self.end[up] = self.end[i]
+
+### Parasite cache #############################################################
+
+class ParasiteCache():
+    """
+    The parasites of each layer, (name, text) pairs read once from GIMP and
+    shared by the window and the reports; 'forget()' after a write.
+    """
+    def __init__(self):
+        # layer ID: pairs
+        self.pairs = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, layer):
+        if layer.ID in self.pairs :
+            self.hits += 1
+            return self.pairs[layer.ID]
+        self.misses += 1
+        n, names = get_parasite_list(layer)
+        # parasite add a zero byte at the end
+        pairs = [(p, str(layer.parasite_find(p)).strip(chr(0))) for p in names]
+        self.pairs[layer.ID] = pairs
+        return pairs
+
+    def forget(self, layer):
+        self.pairs.pop(layer.ID, None)
+
+    def prune(self, objects):
+        # only the layers of the index, 'objects' by ID
+        for ID in [ID for ID in self.pairs if ID not in objects] : del self.pairs[ID]
+
+    def summary(self):
+        return "parasite cache: %d hits, %d misses"%(self.hits, self.misses)
+
+### Thumbnail cache ############################################################
+
+class ThumbnailCache():
+    """
+    Pixbufs of the layer thumbnails by (layer ID, size), for the preview: the
+    'kept' last shown, the least recently shown dropped first. A thumbnail is
+    made by GIMP from the layer alone, without the image projection.
+    """
+    def __init__(self, kept=preview_kept):
+        self.kept = kept
+        # (ID, size): pixbuf, and the keys from the least recently shown
+        self.pixbufs = {}
+        self.order = []
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, layer, size=preview_size):
+        key = (layer.ID, size)
+        if key in self.pixbufs :
+            self.hits += 1
+            self.order.remove(key)
+            self.order.append(key)
+            return self.pixbufs[key]
+        self.misses += 1
+        pixbuf = layer_pixbuf(layer, size)
+        self.pixbufs[key] = pixbuf
+        self.order.append(key)
+        if len(self.order) > self.kept : del self.pixbufs[self.order.pop(0)]
+        return pixbuf
+
+    def prune(self, objects):
+        # only the layers of the index, 'objects' by ID
+        self.order = [key for key in self.order if key[0] in objects]
+        for key in [key for key in self.pixbufs if key[0] not in objects] :
+            del self.pixbufs[key]
+
+    def clear(self):
+        # the layers may have been painted
+        self.pixbufs.clear()
+        del self.order[:]
+
+    def summary(self):
+        return "thumbnail cache: %d hits, %d misses"%(self.hits, self.misses)
+
+def layer_pixbuf(layer, size):
+    """ The thumbnail of 'layer' fitting a square of 'size' pixels, a gtk pixbuf """
+    width, height, bpp, n, data = pdb.gimp_drawable_thumbnail(layer, size, size)
+    # a string or a tuple of the byte values, as the GIMP version gives it
+    if not isinstance(data, str) : data = array('B', data).tostring()
+    # gray, with or without alpha, to RGB
+    if bpp == 1 : data = ''.join([c*3 for c in data])
+    elif bpp == 2 : data = ''.join([data[i]*3 + data[i+1] for i in range(0, len(data), 2)])
+    alpha = bpp in (2, 4)
+    channels = 3 + alpha
+    return gtk.gdk.pixbuf_new_from_data(data, gtk.gdk.COLORSPACE_RGB, alpha, 8,\
+        width, height, width*channels)
+
+### Exclusive view #############################################################
+
+class ExclusiveView():
+    """
+    Layer visibility for the exclusive view. The visibility of each layer is
+    read once on entering the view, when first needed, and kept to be restored;
+    then only the layers changing state are switched, out of the undo stack.
+    After 'restore()' the view reads them again, the user may click the eyes.
+    """
+    def __init__(self, img, index):
+        self.img = img
+        self.index = index
+        # ID: visibility as last read or set, and as found at the start
+        self.state = {}
+        self.original = {}
+        # IDs of the visible layers
+        self.shown = set()
+        self.generation = None
+
+    def read(self):
+        # the layers not seen yet, all of them the first time
+        if self.generation == self.index.generation : return
+        self.generation = self.index.generation
+        for ID, L in zip(self.index.ids, self.index.items) :
+            if ID in self.state : continue
+            self.state[ID] = self.original[ID] = L.visible
+            if self.state[ID] : self.shown.add(ID)
+
+    def switch(self, target):
+        """ 'target' is the IDs to show, all others hidden; returns the switches """
+        self.read()
+        objects = self.index.objects
+        changes = [(ID, False) for ID in self.shown if ID not in target]
+        changes += [(ID, True) for ID in target if not self.state[ID]]
+        changes = [(ID, v) for ID, v in changes if ID in objects]
+        if changes :
+            pdb.gimp_image_undo_freeze(self.img)
+            for ID, visible in changes :
+                objects[ID].visible = visible
+                self.state[ID] = visible
+                if visible : self.shown.add(ID)
+                else : self.shown.discard(ID)
+            pdb.gimp_image_undo_thaw(self.img)
+        # forget the deleted layers
+        self.shown.intersection_update(objects)
+        return len(changes)
+
+    def exclusive(self, pos):
+        """ Only the layer at 'pos' in the index, its children and parents visible """
+        index = self.index
+        target = set(index.ids[pos:index.end[pos]])
+        up = index.parent[pos]
+        while up >= 0 :
+            target.add(index.ids[up])
+            up = index.parent[up]
+        return self.switch(target)
+
+    def restore(self):
+        """
+        The visibility found on entering the view, for the layers still there;
+        then the view is left
+        """
+        objects = self.index.objects
+        # read again, an eye may have been clicked in the view
+        changes = [(ID, v) for ID, v in self.original.items()\
+            if ID in objects and objects[ID].visible != v]
+        if changes :
+            pdb.gimp_image_undo_freeze(self.img)
+            for ID, visible in changes : objects[ID].visible = visible
+            pdb.gimp_image_undo_thaw(self.img)
+        self.leave()
+        return len(changes)
+
+    def leave(self):
+        # nothing kept, the next view reads the visibility
+        self.state.clear()
+        self.original.clear()
+        self.shown.clear()
+        self.generation = None
+
+### Sidecar index ##############################################################
+
+class LayerStore():
+    """
+    The layer rows of the reports for the image files, in a SQLite file. They
+    are kept by file path with its modification time and size: a file changed
+    since gives no rows and its old ones are removed.
+    """
+    def __init__(self, file_name):
+        folder = os.path.dirname(file_name)
+        if not os.path.exists(folder) : os.mkdir(folder)
+        # batch workers can write at the same time
+        self.db = sqlite3.connect(file_name, timeout=30)
+        self.db.executescript("""
+            create table if not exists files (path text primary key,
+                mtime real, size integer, layers integer);
+            create table if not exists layers (path text, position integer,
+                depth integer, parent integer, grp integer, name text, x integer,
+                y integer, width integer, height integer, type text,
+                children text, parasites text);
+            create index if not exists layers_path on layers (path, position);
+            """)
+
+    def stamp(self, path):
+        try : st = os.stat(path)
+        except OSError : return None
+        return st.st_mtime, st.st_size
+
+    def lookup(self, path):
+        """ The rows of 'path' if the file didn't change since, else None """
+        path = text(path)
+        found = self.db.execute("select mtime, size from files where path = ?",\
+            (path,)).fetchone()
+        if found is None : return None
+        if tuple(found) != self.stamp(path) :
+            self.forget(path)
+            return None
+        rows = []
+        for r in self.db.execute("select position, depth, parent, grp, name, x, y,"\
+                " width, height, type, children, parasites from layers where path = ?"\
+                " order by position", (path,)) :
+            rows.append({'position': r[0], 'depth': r[1], 'parent': r[2],\
+                'group': bool(r[3]), 'name': r[4], 'x': r[5], 'y': r[6],\
+                'width': r[7], 'height': r[8], 'type': r[9],\
+                'children': json.loads(r[10]),\
+                'parasites': [tuple(p) for p in json.loads(r[11])]})
+        return rows
+
+    def forget(self, path):
+        with self.db :
+            self.db.execute("delete from layers where path = ?", (path,))
+            self.db.execute("delete from files where path = ?", (path,))
+
+    def keep(self, path, rows):
+        """
+        Yields 'rows' and keeps them for 'path', if all are yielded; the stamp
+        is taken before, a file saved meanwhile will be read again.
+        """
+        path = text(path)
+        stamp = self.stamp(path)
+        kept = []
+        for row in rows :
+            kept.append((path, row['position'], row['depth'], row['parent'],\
+                int(row['group']), text(row['name']), row['x'], row['y'],\
+                row['width'], row['height'], text(row.get('type')),\
+                json.dumps(row['children']), json.dumps(row['parasites'])))
+            yield row
+        if stamp is None : return
+        with self.db :
+            self.db.execute("delete from layers where path = ?", (path,))
+            self.db.execute("insert or replace into files values (?, ?, ?, ?)",\
+                (path, stamp[0], stamp[1], len(kept)))
+            self.db.executemany("insert into layers values"\
+                " (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", kept)
+
+    def close(self):
+        self.db.close()
+
+def layer_store():
+    """ The sidecar index, opened at first use; None without SQLite """
+    global store
+    if store is None and sqlite3 :
+        try : store = LayerStore(store_file)
+        except (sqlite3.Error, OSError) : return None # done without it
+    return store
+
+def saved_file(img):
+    # the file of 'img' if the image is as saved in it, else None
+    name = img.filename
+    if name and not img.dirty and os.path.isfile(name) : return name
+    return None
+
+### Layer list ###############################################################
+
+class LayerListModel(gtk.GenericTreeModel):
+    """
+    The layer list of the window for a 'gtk.TreeView': 'rows' are positions in
+    the 'LayerIndex' and a label is made only when GTK shows its row, by the
+    'label(position)' function. Columns: position from 1, label.
+    """
+    def __init__(self, rows, label):
+        gtk.GenericTreeModel.__init__(self)
+        self.rows = rows
+        self.label = label
+
+    def on_get_flags(self):
+        return gtk.TREE_MODEL_LIST_ONLY | gtk.TREE_MODEL_ITERS_PERSIST
+
+    def on_get_n_columns(self):
+        return 2
+
+    def on_get_column_type(self, n):
+        return (int, str)[n]
+
+    def on_get_iter(self, path):
+        if path[0] < len(self.rows) : return path[0]
+        return None
+
+    def on_get_path(self, rowref):
+        return (rowref,)
+
+    def on_get_value(self, rowref, column):
+        if column == 0 : return self.rows[rowref] + 1
+        return self.label(self.rows[rowref])
+
+    def on_iter_next(self, rowref):
+        if rowref + 1 < len(self.rows) : return rowref + 1
+        return None
+
+    def on_iter_children(self, rowref):
+        if rowref is None and self.rows : return 0
+        return None
+
+    def on_iter_has_child(self, rowref):
+        return False
+
+    def on_iter_n_children(self, rowref):
+        if rowref is None : return len(self.rows)
+        return 0
+
+    def on_iter_nth_child(self, rowref, n):
+        if rowref is None and n < len(self.rows) : return n
+        return None
+
+    def on_iter_parent(self, child):
+        return None
 
 ### GUI integration ############################################################
 
 class LayerViewer(gtk.Window):
     def __init__ (self, img, drw, *args):
-        global layer_view, layers
         self.img = img
         self.drw = drw
 
@@ -75,26 +509,52 @@ class LayerViewer(gtk.Window):
         vbox = gtk.VBox(spacing=6, homogeneous=False)
         hbox = gtk.HBox(homogeneous=False, spacing=6)
 
-        # special line for number of layer choice
-        self.combo_box = gtk.combo_box_new_text() #gtk.ComboBox()
-        #self.combo_box.set_wrap_width(1)
-        self.combo_box.set_has_tooltip(True)
-        self.combo_box.set_tooltip_text(_("Its the selected number of the exclusive view layer.")\
-            +_("\nIf you see this message, you can scroll with the mouse wheel or ")\
-            +_("click to select.\n     WARNING : don't edit in the 'Layer Dialog' and")\
-            +_(" the window is current at the time of that selection only."))
-        self.combo_box.connect("changed", self.name_change)
-        #self.combo_box.style.arrow_size = 20   # no error but don't works
-        hbox.add(self.combo_box)
-
-        # icon to indicate where it applies
-        stock_ic = gtk.Image()
-        stock_ic.set_from_stock(gtk.STOCK_GO_BACK, gtk.ICON_SIZE_BUTTON)
-        hbox.add(stock_ic)
-        label_sel =  gtk.Label(_("Exclusive view layer "))
-        hbox.add(label_sel)
+        # search line over the layer list
+        self.find = gtk.Entry()
+        self.find.set_has_tooltip(True)
+        self.find.set_tooltip_text(_("Type the start of a layer name to go to it, or a part")\
+            +_(" of the names to show with 'Filter'."))
+        self.find.connect("changed", self.search)
+        hbox.add(self.find)
+        self.filter = gtk.CheckButton(_("Filter"))
+        self.filter.connect("toggled", self.search)
+        hbox.add(self.filter)
+        self.kind = gtk.combo_box_new_text()
+        for k in bulk_kinds : self.kind.append_text(k)
+        self.kind.set_active(0)
+        self.kind.connect("changed", self.search)
+        hbox.add(self.kind)
+        self.show_preview = gtk.CheckButton(_("Preview"))
+        self.show_preview.set_has_tooltip(True)
+        self.show_preview.set_tooltip_text(_("Show the selected layer in this window")\
+            +_(" instead of the exclusive view on the canvas."))
+        self.show_preview.connect("toggled", self.preview_toggled)
+        hbox.add(self.show_preview)
         vbox.add(hbox)
 
+        # the layer list, only the rows in sight are read from GIMP
+        self.tree = gtk.TreeView()
+        for n, title in ((0, "#"), (1, _("Exclusive view layer"))) :
+            column = gtk.TreeViewColumn(title, gtk.CellRendererText(), text=n)
+            column.set_sizing(gtk.TREE_VIEW_COLUMN_FIXED)
+            column.set_fixed_width((60, 240)[n])
+            self.tree.append_column(column)
+        # else GTK measures all the rows
+        self.tree.set_fixed_height_mode(True)
+        self.tree.set_enable_search(False)
+        self.tree.set_has_tooltip(True)
+        self.tree.set_tooltip_text(_("Its the selected number of the exclusive view layer.")\
+            +_("\n     WARNING : don't edit in the 'Layer Dialog' and")\
+            +_(" the window is current at the time of that selection only."))
+        self.selection = self.tree.get_selection()
+        self.selection.set_mode(gtk.SELECTION_BROWSE)
+        self.selection.connect("changed", self.name_change)
+        scroll = gtk.ScrolledWindow()
+        scroll.set_policy(gtk.POLICY_NEVER, gtk.POLICY_AUTOMATIC)
+        scroll.set_size_request(-1, 200)
+        scroll.add(self.tree)
+        vbox.add(scroll)
+
         # info under layer name
         self.label = gtk.Label()
         self.label.set_has_tooltip(True)
@@ -102,7 +562,13 @@ class LayerViewer(gtk.Window):
             +_("\nType: Single or Group and the base channels.\n")\
             +_("Parasite: gives the number of layer parasite(s) attached\n")\
             +_("and if 'layer-info' is one or not."))
-        vbox.add(self.label)
+        hbox = gtk.HBox(homogeneous=False, spacing=6)
+        hbox.add(self.label)
+        # thumbnail of the selected layer, with 'Preview'
+        self.preview = gtk.Image()
+        self.preview.set_size_request(preview_size, preview_size)
+        hbox.pack_end(self.preview, expand=False)
+        vbox.add(hbox)
 
         separator = gtk.HSeparator()
         vbox.add(separator)
@@ -137,6 +603,13 @@ class LayerViewer(gtk.Window):
             +_("\nN.B.: a layer parasite is kept only in 'XCF' file."))
         hbox.add(btn)
 
+        btn = gtk.Button(_("Bulk..."))
+        btn.connect("pressed", self.bulk_info)
+        btn.set_has_tooltip(True)
+        btn.set_tooltip_text(_("Enter preceding text in 'layer-info' for the layers of a name")\
+            +_(" pattern and type, or the texts of a CSV file, in one undo step."))
+        hbox.add(btn)
+
         self.btn = gtk.Button(_("Save all"))
         self.btn.connect("pressed", self.save_file)
         self.btn.set_has_tooltip(True)
@@ -144,161 +617,244 @@ class LayerViewer(gtk.Window):
         hbox.add(self.btn)
         vbox.add(hbox)
 
-        # populate the combo_box
-        layers = get_all_layers(self.img)
-        #self.names = [lay.name.replace("\n", "/").replace("'", "\'") for lay in self.layers]
-        max_pos = len(layers)
-        for i in range(max_pos): 
-            self.combo_box.append_text(_("Layer #%d")%(i+1))
-            layer_view.append(layers[i].visible)
+        # the layer list, with the layer names if the file was indexed
+        self.index = LayerIndex(self.img)
+        # layer ID: name, read when shown
+        self.names = {}
+        if saved_file(self.img) and layer_store() :
+            rows = store.lookup(self.img.filename)
+            if rows and len(rows) == len(self.index) :
+                self.names = dict(zip(self.index.ids, [row['name'] for row in rows]))
+        # (lower case name, position) for the search, made at the first one
+        self.sorted = None
+        self.view = ExclusiveView(self.img, self.index)
+        self.parasites = ParasiteCache()
+        self.thumbnails = ThumbnailCache()
+        self.refreshing = False
+        self.refresh_list()
 
         # completes this window, name
         self.add(vbox)
         self.show_all()
+        self.preview.hide()
         self.set_keep_above(True)
 
-        #this call self.name_change()   #if self.flag_names == True : 
-        self.combo_box.set_active(0)
+        #this call self.name_change()
+        self.select(0)
         return r
 
-    def name_change(self, btn, data=None) :
+    def name_change(self, selection, data=None) :
         """
         New layer selection. Take into account a possible edit in the 'Layer Dialog'
         """
+        if self.refreshing : return
+        index = self.selected()
         # still the same image?
         img_list = gimp.image_list()
-        if (self.img not in img_list) or (len(self.img.layers) == 0) :
+        if (self.img not in img_list) :
             gimp.message(prob)
             gtk.main_quit()
             return
-        # check if layers list is the same
-        temp_layers = get_all_layers(self.img)
-        same_layers = layers == temp_layers
-        if same_layers :
-            index = btn.get_active()
-            # check for possible name change -catch first by 'index == -1'
-            if index == -1:
-                gimp.message(_("ERROR: the layer name is no longer there!"))
+        # layers edited in the 'Layer Dialog': follow them, on the selected branch
+        if not self.index.validate(index) :
+            if len(self.index) == 0 :
+                gimp.message(prob)
                 gtk.main_quit()
                 return
+            self.parasites.prune(self.index.objects)
+            self.thumbnails.prune(self.index.objects)
+            self.refresh_list()
+            if index is None or index >= len(self.index) : index = len(self.index) - 1
+            # also calls back this method
+            self.select(index)
+            return
+        # no row selected, all filtered out
+        if index is None : return
 
-            self.layer = layers[index]
-            #> layer offsets
-            x, y = self.layer.offsets
-            #> layer name
-            name = temp_layers[index].name.replace("\n", "/").replace("'", "\'")
-            #> layer size, name
-            h = self.layer.height
-            w = self.layer.width
-            #> layer type
-            _type = self.layer.type
-            # Group or Single + ?
-            if hasattr(self.layer,"layers"): Type = _("Group, ")+enum_type[_type]
-            else: 
-                if pdb.gimp_drawable_is_text_layer(self.layer):
-                    Type = _("Single text, ")+enum_type[_type]
-                else: Type = _("Single, ")+enum_type[_type]
-            #> layer parasite
-            n, parasites = get_parasite_list(self.layer)
-
-            nflag = parasites.count('layer-info')
-            if  nflag == 0:
-                paras_text = ''
-                flag = _('no')
-            else:
-                paras_text = str(self.layer.parasite_find('layer-info'))
-                # parasite add a zero byte at the end which don't agree with 'gtk.label'
-                paras_text = paras_text.strip(chr(0))
-                flag = _("yes") # put parasite text in the entry field
-            
-            # make visibility effect exclusive (also for GroupLayer)
-            for L in layers: L.visible = False
-            make_layer_visible(self.layer)
-            pdb.gimp_displays_flush()
-
-            layer_val = [Type, name, x, y, w , h, n, flag]
-            # packing the layer info into text
-            txt = self.txt%tuple(layer_val)
-            self.label.set_label(txt)
-
-            # and the parasite content
-            if  nflag != 0: 
-                self.entry.set_text(paras_text)
-            else: 
-                self.entry.set_text('')
-
-            # reset label on 'Save' button after a save if there some change
-            if self.flag_save and self.flag_paras:
-                self.btn.set_label(_("Save all"))
-                self.flag_save = False
+        self.layer = self.index.items[index]
+        #> layer offsets
+        x, y = self.layer.offsets
+        #> layer name
+        self.names[self.layer.ID] = self.layer.name
+        name = self.layer.name.replace("\n", "/").replace("'", "\'")
+        #> layer size, name
+        h = self.layer.height
+        w = self.layer.width
+        #> layer type
+        Type = type_text(self.layer)
+        #> layer parasite
+        pairs = self.parasites.get(self.layer)
+        n = len(pairs)
 
-        else :
-            gimp.message(prob)
-            if len(temp_layers) > 0: 
-                make_layer_visible(temp_layers[0])
-            gtk.main_quit()
+        nflag = [p for p, t in pairs].count('layer-info')
+        if  nflag == 0:
+            paras_text = ''
+            flag = _('no')
+        else:
+            # without the zero byte which don't agree with 'gtk.label'
+            paras_text = dict(pairs)['layer-info']
+            flag = _("yes") # put parasite text in the entry field
+        
+        # the thumbnail, else make visibility effect exclusive (also for GroupLayer)
+        if self.show_preview.get_active() :
+            self.preview.set_from_pixbuf(self.thumbnails.get(self.layer))
+        elif self.view.exclusive(index) : pdb.gimp_displays_flush()
+
+        layer_val = [Type, name, x, y, w , h, n, flag]
+        # packing the layer info into text
+        txt = self.txt%tuple(layer_val)
+        self.label.set_label(txt)
+
+        # and the parasite content
+        if  nflag != 0: 
+            self.entry.set_text(paras_text)
+        else: 
+            self.entry.set_text('')
+
+        # reset label on 'Save' button after a save if there some change
+        if self.flag_save and self.flag_paras:
+            self.btn.set_label(_("Save all"))
+            self.flag_save = False
 
         return
 
+    def preview_toggled(self, btn, data=None):
+        """
+        With 'Preview' the canvas gets back its visibilities and the layer
+        is shown in the window; without, the exclusive view again
+        """
+        if btn.get_active() :
+            # new thumbnails, the layers may have been painted
+            self.thumbnails.clear()
+            self.preview.show()
+            if self.view.restore() : pdb.gimp_displays_flush()
+        else :
+            self.preview.hide()
+        self.name_change(self.selection)
+
+    def row_label(self, pos):
+        """ Name of the layer at 'pos' for the list, read at its first display """
+        ID = self.index.ids[pos]
+        if ID not in self.names : self.names[ID] = self.index.items[pos].name
+        return self.names[ID].replace("\n", "/")
+
+    def selected(self):
+        # position in the index of the selected row, or None
+        model, paths = self.selection.get_selected_rows()
+        if not paths : return None
+        return model.rows[paths[0][0]]
+
+    def select(self, pos):
+        """ Select the layer at 'pos' if it is in the list, calls 'name_change()' """
+        rows = self.tree.get_model().rows
+        row = bisect.bisect_left(rows, pos)
+        if row < len(rows) and rows[row] == pos :
+            self.selection.select_path((row,))
+            self.tree.scroll_to_cell((row,))
+
+    def refresh_list(self):
+        """
+        The rows of the list: all layers or those of the type and, with 'Filter',
+        with the search text in the name; the selection is lost
+        """
+        kind = self.kind.get_active()
+        text = self.filter.get_active() and self.find.get_text().lower()
+        rows = range(len(self.index))
+        if kind > 0 :
+            rows = [pos for pos in rows if kind_match(self.index.items[pos], kind)]
+        if text :
+            rows = [pos for pos in rows if text in self.row_label(pos).lower()]
+        self.refreshing = True
+        self.tree.set_model(LayerListModel(rows, self.row_label))
+        self.refreshing = False
+
+    def search(self, widget, data=None):
+        """
+        Filter the list, or go to the first layer (from the top) of a name
+        starting with the search text: a bisection of the sorted names
+        """
+        pos = self.selected()
+        if widget is not self.find or self.filter.get_active() :
+            self.refresh_list()
+            if pos is not None : self.select(pos)
+            return
+        text = self.find.get_text().lower()
+        if not text : return
+        if self.sorted is None or self.sorted[0] != self.index.generation :
+            self.sorted = (self.index.generation, sorted([(self.row_label(i).lower(), i)\
+                for i in range(len(self.index))]))
+        names = self.sorted[1]
+        i = bisect.bisect_left(names, (text, -1))
+        if i < len(names) and names[i][0].startswith(text) : self.select(names[i][1])
+
     def add_info(self, btn) :
         """
         Text into the layer parasite 'layer-info'
         """
         paras_text = self.entry.get_text()
         self.layer.attach_new_parasite('layer-info', 1, paras_text)
+        self.parasites.forget(self.layer)
         self.flag_paras = True
         return
+
+    def bulk_info(self, btn) :
+        """
+        Text of the entry into 'layer-info' for the layers of a name pattern and
+        type, or the texts of a CSV file
+        """
+        dialog = gtk.Dialog(_("Bulk 'layer-info'"), self, gtk.DIALOG_MODAL,\
+            (gtk.STOCK_CANCEL, gtk.RESPONSE_CANCEL, gtk.STOCK_OK, gtk.RESPONSE_OK))
+        table = gtk.Table(rows=3, columns=2, homogeneous=False)
+        table.set_col_spacings(3)
+        table.attach(gtk.Label(_("Name pattern (*, ?) :")), 0, 1, 0, 1)
+        pattern = gtk.Entry()
+        pattern.set_text('*')
+        table.attach(pattern, 1, 2, 0, 1)
+        table.attach(gtk.Label(_("Layer type :")), 0, 1, 1, 2)
+        kind = gtk.combo_box_new_text()
+        for k in bulk_kinds : kind.append_text(k)
+        kind.set_active(0)
+        table.attach(kind, 1, 2, 1, 2)
+        table.attach(gtk.Label(_("Or CSV file (layer, text) :")), 0, 1, 2, 3)
+        chooser = gtk.FileChooserButton(_("CSV file of 'layer-info' texts"))
+        table.attach(chooser, 1, 2, 2, 3)
+        dialog.vbox.add(table)
+        dialog.show_all()
+        response = dialog.run()
+        mapping_file = chooser.get_filename()
+        choice = (pattern.get_text(), kind.get_active())
+        dialog.destroy()
+        if response != gtk.RESPONSE_OK : return
+
+        if not self.index.validate() : self.refresh_list()
+        try :
+            if mapping_file : changes = mapping_changes(self.index, read_mapping(mapping_file))
+            else : changes = [(L, self.entry.get_text())\
+                for L in bulk_targets(self.index, choice[0], choice[1])]
+        except (IOError, ValueError) as err :
+            gimp.message(_("ERROR in reading the CSV file: ")+str(err))
+            return
+        count, lapse = write_infos(self.img, changes, self.parasites)
+        self.flag_paras = True
+        gimp.message(_("INFO: 'layer-info' written for %d layers in %.2f s.")%(count, lapse))
+        # the selected layer may be one of them
+        self.name_change(self.selection)
+        return
         
     def save_file(self, btn, data=None) :
         """ 
-        Create a text file with the info for all layers and their parasites
+        Create a file with the info for all layers and their parasites
         """
-        
-        # for a XML file see  'Python-Fu #3 - Working with Layers and XML in Python-Fu'
-        filename = ""
-        tags = (_(') Group'), _(') Single'))
-
         btn.set_label(_("Save all"))    # to reflect prob. if saving more than once
-        # start building our text file first by an introduction
-        txt = _("# An info layers file for '%s' in GIMP%s.\n")%(self.img.name, str(version))\
-            +_("# Base colour type is '%s' for this image of size = %dx%d px.\n")\
-            %(enum_type[self.img.base_type * 2], self.img.width, self.img.height)\
-            +_("# The classification 'Group' means has child(s) while 'Single' has not.\n")\
-            +_("# Note: in text variable the newline have been replaced by '/'.\n\n")
-
-        cr = 1  # the position of the layer
-        for L in layers:    # all the layers
-            if version >= (2, 8, 0): childs = L.children
-            else: childs = None
-            if childs: 
-                tag = tags[0]
-                children = _(" Childs=%s,")%(str([c.name.replace("\n", "/") for c in childs]))
-                # here: '.replace("\n", "/")' is there for naming consistency only
-            else: 
-                tag = tags[1]
-                children = ""
-            # file the content for each layer and add the parasite info list
-            n, paras = get_parasite_list(L)
-            if n == 0: dot = ' .'
-            else: dot = ' :'
-            txt += _("%d%s name=\"%s\", Offsets=(%d , %d), Width*Height=%d*%d px,%s Parasite=%d%s\n")\
-                %(cr, tag, L.name.replace("\n", "/"), L.offsets[0], L.offsets[1],\
-                 L.width, L.height, children, n, dot)
-            for p in paras:
-                paras_text = str(L.parasite_find(p))
-                paras_text = paras_text.strip(chr(0))
-                paras_text = paras_text.replace("\n", "/")
-                txt.rstrip()                
-                txt += "    -> %s = \"%s\"\n"%(p, paras_text)
-            cr += 1
-        
+
         # file: user chosen file-name ("%s_layout.txt"%self.img.name)
         chooser = gtk.FileChooserDialog(title=_("User file selection"),
                                     action=gtk.FILE_CHOOSER_ACTION_SAVE,
                                     buttons=(gtk.STOCK_CANCEL, gtk.RESPONSE_CANCEL,
                                              gtk.STOCK_SAVE, gtk.RESPONSE_OK))
         chooser.set_current_name(os.path.basename("%s_layout.txt"%self.img.name))
-        la = gtk.Label(_("Suggestion: you can use a folder like '.../Images/layouts/' for this file."))
+        la = gtk.Label(_("Suggestion: you can use a folder like '.../Images/layouts/' for this file.")\
+            +_("\nThe extension '.csv', '.jsonl' or '.xml' gives that format, else text."))
         la.show()
         chooser.set_extra_widget(la)
         # could be the folder of the open image as default?
@@ -311,53 +867,352 @@ class LayerViewer(gtk.Window):
             return
 
         filename = chooser.get_filename()
+        chooser.destroy()
         if filename:
+            # the rows go to the file as the layers come
+            if not self.index.validate() : self.refresh_list()
             try:
-                file_obj = open(filename, "w")
-                file_obj.write(txt);
-                file_obj.close()
+                export_layers(self.img, filename, self.index, self.parasites)
                 # for a file save ->
                 btn.set_label(_("Save all (done)"))
-                #self.pre_save = self.names
                 self.flag_save = True
                 self.flag_paras = False # reset for 'Enter text'
             except:
                 gimp.message(_("ERROR in saving file: ")+filename)
                 
         else: gimp.message(_("ERROR: no file-name given!"))
-
-        chooser.destroy()
         return
 
+### Layer report ###############################################################
+
+def layer_rows(index, types=False, parasites=None):
+    """
+    Yields the info of each layer of the 'LayerIndex', from the top, as a
+    dictionary; the name and parasite texts are as GIMP has them, the parasites
+    from the 'ParasiteCache' if given. The 'type' of the window, with 'types',
+    costs one or two PDB calls more by layer.
+    """
+    if parasites is None : parasites = ParasiteCache()
+    position = {}
+    for L, depth, parent in index.walk() :
+        position[L.ID] = len(position) + 1
+        if parent is None : up = 0
+        else : up = position[parent.ID]
+        childs = [index.objects[i].name for i in index.kids.get(L.ID, ())]
+        paras = parasites.get(L)
+        x, y = L.offsets
+        row = {'position': position[L.ID], 'depth': depth, 'parent': up,\
+               'group': len(childs) > 0, 'name': L.name, 'x': x, 'y': y,\
+               'width': L.width, 'height': L.height, 'children': childs,\
+               'parasites': paras}
+        if types : row['type'] = type_text(L)
+        yield row
+
+def utf8(text):
+    # Python 2 'csv' and 'file.write' want bytes
+    if isinstance(text, unicode) : return text.encode('utf-8')
+    return text
+
+def write_text(file_obj, head, rows):
+    """ The 'Save all' text file: a line by layer and one by parasite """
+    tags = (_(') Group'), _(') Single'))
+    # start building our text file first by an introduction
+    file_obj.write(utf8(_("# An info layers file for '%s' in GIMP%s.\n")%(head['image'], str(version))\
+        +_("# Base colour type is '%s' for this image of size = %dx%d px.\n")\
+        %(enum_type[head['base_type'] * 2], head['width'], head['height'])\
+        +_("# The classification 'Group' means has child(s) while 'Single' has not.\n")\
+        +_("# Note: in text variable the newline have been replaced by '/'.\n\n")))
+    count = 0
+    for row in rows :
+        if row['group'] :
+            tag = tags[0]
+            children = _(" Childs=%s,")%(str([c.replace("\n", "/") for c in row['children']]))
+            # here: '.replace("\n", "/")' is there for naming consistency only
+        else :
+            tag = tags[1]
+            children = ""
+        if row['parasites'] : dot = ' :'
+        else : dot = ' .'
+        file_obj.write(utf8(_("%d%s name=\"%s\", Offsets=(%d , %d), Width*Height=%d*%d px,%s Parasite=%d%s\n")\
+            %(row['position'], tag, row['name'].replace("\n", "/"), row['x'], row['y'],\
+             row['width'], row['height'], children, len(row['parasites']), dot)))
+        for p, paras_text in row['parasites'] :
+            file_obj.write(utf8("    -> %s = \"%s\"\n"%(p, paras_text.replace("\n", "/"))))
+        count += 1
+    return count
+
+# columns of the CSV report
+report_keys = ('position', 'depth', 'parent', 'group', 'name', 'x', 'y', 'width',\
+    'height', 'type', 'children', 'parasites')
+
+def write_csv(file_obj, head, rows, keys=report_keys):
+    """ A header line then a line by layer, the parasites as a JSON object """
+    writer = csv.writer(file_obj)
+    writer.writerow(keys)
+    count = 0
+    for row in rows :
+        row['group'] = int(row['group'])
+        row['children'] = json.dumps(row['children'])
+        row['parasites'] = json.dumps(dict(row['parasites']))
+        writer.writerow([utf8(row[k]) for k in keys])
+        count += 1
+    return count
+
+def write_jsonl(file_obj, head, rows):
+    """ The image on the first line (if 'head'), then a JSON object by layer """
+    if head : file_obj.write(json.dumps(head, sort_keys=True) + "\n")
+    count = 0
+    for row in rows :
+        row['parasites'] = dict(row['parasites'])
+        file_obj.write(json.dumps(row, sort_keys=True) + "\n")
+        count += 1
+    return count
+
+def write_xml(file_obj, head, rows):
+    """ An element by layer in the image element, their parasites inside """
+    attrs = lambda d, keys : ' '.join(['%s=%s'%(k, quoteattr(utf8(unicode(d[k]))))\
+        for k in keys])
+    file_obj.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    file_obj.write('<image %s>\n'%attrs(head, ('image', 'gimp', 'base_type', 'width', 'height')))
+    count = 0
+    for row in rows :
+        row['group'] = int(row['group'])
+        tag = '  <layer %s'%attrs(row, ('position', 'depth', 'parent', 'group', 'name',\
+            'x', 'y', 'width', 'height', 'type'))
+        if not row['parasites'] :
+            file_obj.write(tag + '/>\n')
+        else :
+            file_obj.write(tag + '>\n')
+            for p, paras_text in row['parasites'] :
+                file_obj.write('    <parasite name=%s>%s</parasite>\n'\
+                    %(quoteattr(utf8(p)), escape(utf8(paras_text))))
+            file_obj.write('  </layer>\n')
+        count += 1
+    file_obj.write('</image>\n')
+    return count
+
+# extension: writer
+writers = {'.csv': write_csv, '.jsonl': write_jsonl, '.xml': write_xml}
+
+def export_layers(img, filename, index=None, parasites=None):
+    """
+    Writes the info of all the layers in 'filename' while it reads them, the
+    format from its extension (text by default); returns the number of layers.
+    For an image as saved in its file, the rows go also in the sidecar index.
+    """
+    writer = writers.get(os.path.splitext(filename)[1].lower(), write_text)
+    if index is None : index = LayerIndex(img)
+    head = {'image': img.name, 'gimp': '.'.join([str(v) for v in version]), 'base_type': img.base_type,\
+            'width': img.width, 'height': img.height}
+    saved = saved_file(img)
+    if saved and layer_store() :
+        rows = store.keep(saved, layer_rows(index, True, parasites))
+    else : rows = layer_rows(index, writer is not write_text, parasites)
+    file_obj = open(filename, 'wb')
+    try : count = writer(file_obj, head, rows)
+    finally : file_obj.close()
+    return count
+
+### Batch inventory ############################################################
+
+xcf_ext = ('.xcf', '.xcf.gz', '.xcf.bz2')
+
+def gimp_console():
+    """
+    GIMP without interface for the batch workers: the INFO_LAYERS_GIMP_CONSOLE
+    environment variable, else 'gimp-console-2.x' or 'gimp-console' of the
+    running GIMP (its 'bin' folder), else of the PATH
+    """
+    command = os.environ.get('INFO_LAYERS_GIMP_CONSOLE')
+    if command : return command
+    names = ['gimp-console-%d.%d'%gimp.version[:2], 'gimp-console']
+    if os.name == 'nt' : names = [name + '.exe' for name in names]
+    # 'data_directory' is [prefix]/share/gimp/2.0
+    prefix = os.path.normpath(os.path.join(gimp.data_directory, '..', '..', '..'))
+    for name in names :
+        command = os.path.join(prefix, 'bin', name)
+        if os.path.isfile(command) : return command
+    for name in names :
+        command = find_executable(name)
+        if command : return command
+    return names[-1]
+
+def batch_files(pattern):
+    """ The XCF files of a folder, or the files of a glob pattern, sorted """
+    if os.path.isdir(pattern) :
+        found = []
+        for ext in xcf_ext : found += glob.glob(os.path.join(pattern, '*' + ext))
+    else : found = glob.glob(pattern)
+    return sorted(set(found))
+
+def batch_rows(files, skipped):
+    """
+    Yields the rows of all the layers of 'files', with their 'file'; from the
+    sidecar index for the files not changed since, else one image open at a
+    time, deleted after. The files GIMP can't load go in 'skipped'.
+    """
+    layer_store()
+    for nr, file_name in enumerate(files) :
+        gimp.progress_update(float(nr)/len(files))
+        rows = store and store.lookup(file_name)
+        if rows :
+            for row in rows :
+                row['file'] = file_name
+                yield row
+            continue
+        try : img = pdb.gimp_file_load(file_name, file_name)
+        except RuntimeError :
+            skipped.append(file_name)
+            continue
+        try :
+            rows = layer_rows(LayerIndex(img), True)
+            if store : rows = store.keep(file_name, rows)
+            for row in rows :
+                row['file'] = file_name
+                yield row
+        finally : pdb.gimp_image_delete(img)
+
+def write_batch(files, file_name, skipped):
+    """
+    One CSV or JSON Lines file for 'files', returns the number of layers; the
+    files GIMP can't load go in 'skipped'
+    """
+    file_obj = open(file_name, 'wb')
+    try :
+        if file_name.lower().endswith('.csv') :
+            count = write_csv(file_obj, None, batch_rows(files, skipped),\
+                ('file',) + report_keys)
+        else : count = write_jsonl(file_obj, None, batch_rows(files, skipped))
+    finally : file_obj.close()
+    return count
+
+def scheme_string(text):
+    return '"%s"'%text.replace('\\', '\\\\').replace('"', '\\"')
+
+def batch_workers(pattern, file_name, workers):
+    """
+    'workers' GIMP processes each doing a share of the files in a part file,
+    then the parts joined in 'file_name'; returns the number of layers
+    """
+    # the same extension, so the same format
+    base, ext = os.path.splitext(file_name)
+    parts = ["%s.part%d%s"%(base, k, ext) for k in range(workers)]
+    procs = []
+    console = gimp_console()
+    for k in range(workers) :
+        command = "(python-fu-info-layers-batch RUN-NONINTERACTIVE %s %s %d %d)"\
+            %(scheme_string(pattern), scheme_string(parts[k]), workers, k)
+        procs.append(subprocess.Popen([console, '-i', '-d', '-f', '-b',\
+            command, '-b', '(gimp-quit 0)']))
+    failed = [k for k in range(workers) if procs[k].wait() != 0]
+    if failed : gimp.message(_("ERROR: the batch workers %s have failed.")%str(failed))
+
+    count = 0
+    header_done = False
+    file_obj = open(file_name, 'wb')
+    csv_out = file_name.lower().endswith('.csv')
+    if csv_out : writer = csv.writer(file_obj)
+    for k, part in enumerate(parts) :
+        if not os.path.isfile(part) : continue
+        part_obj = open(part, 'rb')
+        if csv_out :
+            reader = csv.reader(part_obj)
+            # the header of the first part, the data rows of all
+            header = next(reader, None)
+            if header and not header_done :
+                writer.writerow(header)
+                header_done = True
+            for line in reader :
+                writer.writerow(line)
+                count += 1
+        else :
+            for line in part_obj :
+                file_obj.write(line)
+                count += 1
+        part_obj.close()
+        os.remove(part)
+    file_obj.close()
+    return count
+
+### Bulk 'layer-info' #########################################################
+
+bulk_kinds = [_("All layers"), _("Group layers"), _("Single layers"), _("Text layers")]
+
+def bulk_targets(index, pattern='*', kind=0):
+    """
+    The layers of the 'LayerIndex' with a name matching 'pattern' (shell style)
+    and of the 'kind' in 'bulk_kinds'
+    """
+    for L in index.items :
+        if not kind_match(L, kind) : continue
+        if pattern not in ('', '*') and not fnmatch.fnmatchcase(L.name, pattern) : continue
+        yield L
+
+def kind_match(layer, kind):
+    """ Is 'layer' of the 'kind' in 'bulk_kinds'? """
+    if kind == 0 : return True
+    group = isinstance(layer, group_type)
+    if kind == 1 : return group
+    if group : return False
+    return kind == 2 or bool(pdb.gimp_drawable_is_text_layer(layer))
+
+def read_mapping(file_name):
+    """
+    (layer, text) from a CSV file: the layer is a position from the top (a
+    number) or a name. A 'Save all' CSV report gives its 'layer-info' by position.
+    """
+    file_obj = open(file_name, 'rb')
+    try : rows = [row for row in csv.reader(file_obj) if row and not row[0].startswith('#')]
+    finally : file_obj.close()
+    if not rows : return []
+    mapping = []
+    if 'parasites' in rows[0] and 'position' in rows[0] :
+        pos, paras = rows[0].index('position'), rows[0].index('parasites')
+        for row in rows[1:] :
+            text = json.loads(row[paras]).get('layer-info')
+            if text is not None : mapping.append((int(row[pos]), text))
+        return mapping
+    for row in rows :
+        if len(row) < 2 : raise ValueError(_("no text for '%s'")%row[0])
+        if row[0].strip().isdigit() : mapping.append((int(row[0]), row[1]))
+        else : mapping.append((row[0], row[1]))
+    return mapping
+
+def mapping_changes(index, mapping):
+    """ (layer, text) for the positions and names of 'mapping' in the 'LayerIndex' """
+    by_name = {}
+    if [key for key, text in mapping if not isinstance(key, int)] :
+        for L in index.items : by_name.setdefault(L.name, []).append(L)
+    changes = []
+    for key, text in mapping :
+        if isinstance(key, int) :
+            if 1 <= key <= len(index) : changes.append((index.items[key - 1], text))
+        else : changes += [(L, text) for L in by_name.get(utf8(key), [])]
+    return changes
+
+def write_infos(img, changes, parasites=None):
+    """
+    'layer-info' texts for the (layer, text) 'changes', in one undo step and one
+    display flush; returns the number of layers and the time
+    """
+    start = time.time()
+    img.undo_group_start()
+    try :
+        for L, text in changes :
+            L.attach_new_parasite('layer-info', 1, utf8(text))
+            if parasites : parasites.forget(L)
+    finally : img.undo_group_end()
+    pdb.gimp_displays_flush()
+    return len(changes), time.time() - start
+
 ### Helper functions ###########################################################
 
-def get_all_layers(parent):
-    """
-    Layers traversal for GIMP > 2.7, but work also for 2.6 .
-    Get all layers recursively from 'parent', either an Image or a GroupLayer.
-    Proceeds depth-first. From 'Seldom Needy'
-    """
-    container=[]
-    for layer in parent.layers:
-        container.append(layer)
-        if hasattr(layer,"layers"):
-            container.extend(get_all_layers(layer) )
-    return container
-
-def make_layer_visible(layer):
-    """ 
-    Work for group layer also
-    """
-    layer.visible = True
-    # children visible
-    if hasattr(layer,"layers"):
-        layers = get_all_layers(layer)
-        for L in layers: L.visible = True
-    # parent visible
-    while layer.parent != None: 
-        layer = layer.parent
-        layer.visible = True
-    return
+def type_text(layer):
+    """ Group or Single, text or not, and the base channels """
+    _type = enum_type[layer.type]
+    if isinstance(layer, group_type): return _("Group, ")+_type
+    if pdb.gimp_drawable_is_text_layer(layer): return _("Single text, ")+_type
+    return _("Single, ")+_type
 
 def get_parasite_list(item):
     # adaptation to GIMP version?
@@ -365,6 +1220,11 @@ def get_parasite_list(item):
     else: n, parasites = pdb.gimp_drawable_parasite_list(item)
     return(n, parasites)
 
+def text(value):
+    # SQLite wants unicode, GIMP gives utf-8 bytes
+    if isinstance(value, str) : return value.decode('utf-8', 'replace')
+    return value
+
 ### Main procedure #############################################################
 
 def info_layers(img, drw):
@@ -380,17 +1240,47 @@ def info_layers(img, drw):
 
         shelf['info_layers'] = False
         if (img in gimp.image_list()):
-            layers_aft = get_all_layers(img) 
-            if layers_aft == layers: 
-                for i in range(len(layers)): layers[i].visible = layer_view[i]
+            r.index.validate()
+            r.view.restore()
             img.undo_group_end()
 
+def info_layers_export(img, file_name):
+    """ 'Save all' without window, for scripts and batch """
+    return export_layers(img, file_name)
+
+def info_layers_bulk(img, pattern, kind, text, mapping_file):
+    """ Bulk 'layer-info' without window, returns the number of layers """
+    index = LayerIndex(img)
+    if mapping_file : changes = mapping_changes(index, read_mapping(mapping_file))
+    else : changes = [(L, text) for L in bulk_targets(index, pattern, kind)]
+    return write_infos(img, changes)[0]
+
+def info_layers_batch(pattern, file_name, workers, shard):
+    """
+    The layers of many XCF files in one CSV or JSON Lines file. With more than
+    one worker, as many 'gimp-console' do each a shard (the files of rank 'shard'
+    modulo 'workers', -1 for all) of the sorted file list.
+    """
+    files = batch_files(pattern)
+    workers = max(1, int(workers))
+    gimp.progress_init(_("Info-layers batch: %d files")%len(files))
+    skipped = []
+    if shard >= 0 : count = write_batch(files[shard::workers], file_name, skipped)
+    elif workers > 1 and len(files) > 1 :
+        count = batch_workers(pattern, file_name, min(workers, len(files)))
+    else : count = write_batch(files, file_name, skipped)
+    # in the messages of each worker for a shard
+    if skipped :
+        gimp.message(_("Info-layers batch: GIMP can't load %d files:\n")%len(skipped)\
+            + '\n'.join(skipped))
+    return len(files), count
+
 register(
         'info_layers',
         _("Display info and manage the selected layer; with an exclusive view, an ")\
             +_("info parasite and also an all info file.\nFrom: ")+fi,
         _("Display a window with info on the selected layer; the controls are ")\
-            +_("a ComboBox for layer number selection, 'Enter text' in a layer ")\
+            +_("a searchable list for layer selection, 'Enter text' in a layer ")\
             +_("parasite and 'Save all' in a text file."),
         'R. Brizard',
         '((c) GPL 2, R. Brizard)',
@@ -407,5 +1297,79 @@ register(
         domain=( "info_layers", locale_directory)
         )
 
+register(
+        'info_layers_export',
+        _("Save the info of all layers and their parasites in a file, as 'Save all' ")\
+            +_("of 'Info-layers'.\nFrom: ")+fi,
+        _("The format comes from the file extension: '.csv', '.jsonl', '.xml' or else ")\
+            +_("text. Returns the number of layers."),
+        'R. Brizard',
+        '((c) GPL 2, R. Brizard)',
+        '2014',
+        "",
+        "",
+        [
+          (PF_IMAGE, "img", "IMAGE:", None),
+          (PF_STRING, "file_name", "File name:", "")
+        ], # Parameters
+        [
+          (PF_INT, "count", "Number of layers")
+        ], # Results
+        info_layers_export,
+        domain=( "info_layers", locale_directory)
+        )
+
+register(
+        'info_layers_bulk',
+        _("Enter a text in the 'layer-info' parasite of many layers, in one undo step.")\
+            +_("\nFrom: ")+fi,
+        _("The layers of a name pattern (shell style, '*' for all) and type, with 'text'; ")\
+            +_("or with a CSV file (layer position or name, text), the texts of this file.")\
+            +_(" Returns the number of layers."),
+        'R. Brizard',
+        '((c) GPL 2, R. Brizard)',
+        '2014',
+        "",
+        "",
+        [
+          (PF_IMAGE, "img", "IMAGE:", None),
+          (PF_STRING, "pattern", "Name pattern:", "*"),
+          (PF_OPTION, "kind", "Layer type:", 0, bulk_kinds),
+          (PF_STRING, "text", "Text:", ""),
+          (PF_STRING, "mapping_file", "CSV file or empty:", "")
+        ], # Parameters
+        [
+          (PF_INT, "count", "Number of layers")
+        ], # Results
+        info_layers_bulk,
+        domain=( "info_layers", locale_directory)
+        )
+
+register(
+        'info_layers_batch',
+        _("Save the info of the layers of many XCF files in one CSV or JSON Lines ")\
+            +_("file, without window.\nFrom: ")+fi,
+        _("'pattern' is a folder (its XCF files) or a glob pattern. With more than one ")\
+            +_("worker, that number of 'gimp-console' processes share the files; 'shard' ")\
+            +_("is for them, -1 otherwise. Returns the numbers of files and layers."),
+        'R. Brizard',
+        '((c) GPL 2, R. Brizard)',
+        '2014',
+        "",
+        "",
+        [
+          (PF_STRING, "pattern", "Folder or glob pattern:", ""),
+          (PF_STRING, "file_name", "File name (.csv or .jsonl):", ""),
+          (PF_INT, "workers", "Number of GIMP processes:", 1),
+          (PF_INT, "shard", "Worker rank or -1:", -1)
+        ], # Parameters
+        [
+          (PF_INT, "files", "Number of files"),
+          (PF_INT, "count", "Number of layers")
+        ], # Results
+        info_layers_batch,
+        domain=( "info_layers", locale_directory)
+        )
+
 main() 
 
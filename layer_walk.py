@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""
+ Layer tree traversal for the plug-ins.
+
+================================================================================
+ Generators with an explicit stack (or queue): no recursion, so no limit on
+ the group nesting, and no list of the whole tree is built; the layers come
+ one at a time, with their depth and their parent group. Group children are
+ read when the walk reaches the group, one PDB call by group.
+
+     for layer, depth, parent in walk_layers(img) : ...
+
+================================================================================
+ You may use and distribute this module under the terms of the GPL 2 or greater.
+"""
+
+from collections import deque
+
+import gimp
+
+# GIMP-2.6 has no group layer
+group_type = getattr(gimp, 'GroupLayer', ())
+
+def walk_tree(roots, children, breadth_first=False):
+    """
+    Yields (node, depth, parent) from the 'roots' sequence, 'children(node)'
+    being the sequence under a node (or None). Depth-first from the top as the
+    'Layers' dialog shows it, or breadth-first; 'parent' is None for a root.
+    """
+    if breadth_first :
+        queue = deque([(node, 0, None) for node in roots])
+        while queue :
+            node, depth, parent = queue.popleft()
+            yield node, depth, parent
+            below = children(node)
+            if below : queue.extend([(child, depth + 1, node) for child in below])
+    else :
+        stack = [(node, 0, None) for node in reversed(roots)]
+        while stack :
+            node, depth, parent = stack.pop()
+            yield node, depth, parent
+            below = children(node)
+            if below :
+                stack.extend([(child, depth + 1, node) for child in reversed(below)])
+
+def group_children(layer):
+    # no PDB call for a layer which is not a group
+    if isinstance(layer, group_type) : return layer.layers
+    return None
+
+def walk_layers(container, breadth_first=False):
+    """
+    Yields (layer, depth, parent group) for all the layers under 'container',
+    an image or a group layer; the parent is None for its direct children.
+    """
+    return walk_tree(container.layers, group_children, breadth_first)